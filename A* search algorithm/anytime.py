@@ -0,0 +1,110 @@
+import time
+
+from code import reconstruct_path
+from expand import expand
+from heuristics import as_heuristic
+from priority_queue import IndexedMinHeap
+
+INF = float('inf')
+
+def anytime_a_star_search(dis_map, time_map, start, end, deadline, weight=3, step=0.5, callback=None):
+	"""
+	Anytime Repairing A* (ARA*) with a wall-clock deadline
+
+	Starts as weighted A* with the given weight for a fast first path, then
+	lowers the weight by step and repairs the search, reusing the previous
+	g costs, until the path is optimal or the deadline passes. The bound is
+	min(weight, cost / min over open nodes of g + h); with an admissible
+	heuristic the path costs at most bound times the optimal cost.
+	Expansions are counted in expand.expand_count.
+
+	Parameters:
+	dis_map (Dict|Heuristic): dis_map[node][end] table or heuristic provider
+	time_map (Dict): travel times, missing edges may be stored as None
+	start (Hashable): start node
+	end (Hashable): end node
+	deadline (Float): seconds the search may run
+	weight (Float): initial heuristic weight, at least 1
+	step (Float): how much the weight is lowered after every solution
+	callback (Callable): called as callback(path, cost, bound) for every improved path
+
+	Returns:
+	Tuple: (path, cost, bound), ([], inf, inf) when no path was found in time
+	"""
+	stop_at = time.perf_counter() + deadline
+	heuristic = as_heuristic(dis_map)
+	if start not in heuristic or end not in heuristic:
+		return [], INF, INF
+
+	h_costs = {}
+	def h(node):
+		if node not in h_costs:
+			h_costs[node] = heuristic(node, end)
+		return h_costs[node]
+
+	g_costs = {start: 0}
+	parent = {start: None}
+	open_nodes = IndexedMinHeap()
+	open_nodes.push(start, weight * h(start))
+	closed_nodes = set()
+	# nodes improved after being expanded in the current iteration
+	inconsistent = set()
+	best = ([], INF, INF)
+
+	def improve_path():
+		# weighted A* that stops once end is the best node, False on timeout
+		while len(open_nodes) > 0 and g_costs.get(end, INF) + weight * h(end) > open_nodes.peek()[0]:
+			if time.perf_counter() >= stop_at:
+				return False
+			node = open_nodes.pop()[1]
+			closed_nodes.add(node)
+			if node not in time_map:
+				continue
+			for next_node in expand(node, time_map):
+				if next_node not in heuristic:
+					continue
+				g_cost = g_costs[node] + time_map[node][next_node]
+				if g_cost >= g_costs.get(next_node, INF):
+					continue
+				g_costs[next_node] = g_cost
+				parent[next_node] = node
+				if next_node in closed_nodes:
+					inconsistent.add(next_node)
+				elif next_node in open_nodes:
+					open_nodes.decrease_key(next_node, g_cost + weight * h(next_node))
+				else:
+					open_nodes.push(next_node, g_cost + weight * h(next_node))
+		return True
+
+	while True:
+		finished = improve_path()
+		if end in g_costs:
+			cost = g_costs[end]
+			if finished:
+				# g + h of the open and inconsistent nodes bounds the optimal cost
+				frontier = [g_costs[node] + h(node) for node in list(open_nodes.position) + list(inconsistent)]
+				lower_bound = min(frontier) if frontier else cost
+				bound = max(1.0, min(weight, cost / lower_bound)) if lower_bound > 0 else weight
+			elif best[0]:
+				# an interrupted repair only keeps the bound of the last solution
+				bound = best[2] * cost / best[1]
+			else:
+				bound = INF
+			if cost < best[1] or bound < best[2]:
+				best = (reconstruct_path(parent, end), cost, bound)
+				if callback is not None:
+					callback(*best)
+		if not finished or best[2] <= 1 or time.perf_counter() >= stop_at:
+			break
+		if len(open_nodes) == 0 and not inconsistent:
+			break
+		# lower the weight and repair: reopen inconsistent nodes, reorder open
+		weight = max(1, weight - step)
+		for node in inconsistent:
+			if node not in open_nodes:
+				open_nodes.push(node, 0)
+		inconsistent.clear()
+		for node in list(open_nodes.position):
+			open_nodes.update(node, g_costs[node] + weight * h(node))
+		closed_nodes.clear()
+	return best
@@ -0,0 +1,74 @@
+import multiprocessing
+
+from code import dijkstra, reconstruct_path
+
+INF = float('inf')
+
+# graph read by the pool workers, inherited through fork or set once per
+# worker by _init_worker when fork is not available
+_time_map = None
+
+def _init_worker(time_map):
+	global _time_map
+	_time_map = time_map
+
+def _route_row(task):
+	# one Dijkstra from source that stops when every target is settled
+	source, targets, with_paths = task
+	dist, parent = dijkstra(_time_map, source, targets)
+	row = [dist.get(target, INF) for target in targets]
+	if not with_paths:
+		return row, None
+	return row, [reconstruct_path(parent, target) if target in dist else [] for target in targets]
+
+def route_matrix(time_map, sources, targets, processes=None, paths=False):
+	"""
+	Computes the travel time from every source to every target
+
+	Queries are grouped by source, each distinct source runs a single
+	Dijkstra search over all targets. The searches are spread over a process
+	pool; with the fork start method the workers share the parent's copy of
+	time_map, otherwise it is sent to each worker once.
+
+	Parameters:
+	time_map (Dict): travel times, missing edges may be stored as None
+	sources (List): origin nodes, one matrix row each
+	targets (List): destination nodes, one matrix column each
+	processes (Int): pool size, defaults to the number of CPUs, 1 runs in this process
+	paths (Boolean): also return the shortest paths
+
+	Returns:
+	Tuple: (matrix, paths) where matrix[i][j] is the travel time from sources[i]
+		to targets[j] (inf if unreachable) and paths[i][j] the matching path,
+		paths is None unless requested
+	"""
+	global _time_map
+	targets = list(targets)
+	distinct_sources = list(dict.fromkeys(sources))
+	tasks = [(source, targets, paths) for source in distinct_sources]
+	if processes is None:
+		processes = multiprocessing.cpu_count()
+	processes = min(processes, len(tasks))
+
+	if processes <= 1:
+		_time_map = time_map
+		try:
+			results = [_route_row(task) for task in tasks]
+		finally:
+			_time_map = None
+	elif 'fork' in multiprocessing.get_all_start_methods():
+		_time_map = time_map
+		try:
+			with multiprocessing.get_context('fork').Pool(processes) as pool:
+				results = pool.map(_route_row, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+		finally:
+			_time_map = None
+	else:
+		with multiprocessing.Pool(processes, _init_worker, (time_map,)) as pool:
+			results = pool.map(_route_row, tasks, chunksize=max(1, len(tasks) // (4 * processes)))
+
+	rows = dict(zip(distinct_sources, results))
+	matrix = [rows[source][0] for source in sources]
+	if not paths:
+		return matrix, None
+	return matrix, [rows[source][1] for source in sources]
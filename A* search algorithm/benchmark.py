@@ -0,0 +1,196 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import code as sc
+import expand
+from contraction import ContractionHierarchy
+from graph import CSRGraph, reverse_map
+from grid import OccupancyGrid, jump_point_search, octile
+from heuristics import MemoizedHeuristic
+from landmarks import LandmarkHeuristic
+
+def grid_road_map(side, seed=0):
+	# 4-connected side x side grid with random travel times in [1, 3]
+	# only real edges are stored, so the map is O(V) instead of O(V^2)
+	rng = random.Random(seed)
+	time_map = {}
+	for r in range(side):
+		for c in range(side):
+			time_map[(r, c)] = {}
+	for r in range(side):
+		for c in range(side):
+			for dr, dc in ((0, 1), (1, 0)):
+				if r + dr < side and c + dc < side:
+					t = rng.randint(1, 3)
+					time_map[(r, c)][(r + dr, c + dc)] = t
+					time_map[(r + dr, c + dc)][(r, c)] = t
+	return time_map
+
+def obstacle_grid(side, density=0.2, seed=0):
+	# 8-connected side x side grid with random blocked cells
+	return OccupancyGrid.random(side, side, density, seed)
+
+def obstacle_grid_map(side, density=0.2, seed=0):
+	return obstacle_grid(side, density, seed).to_time_map()
+
+def manhattan(node, goal):
+	# manhattan distance times the minimum edge time is admissible
+	return abs(node[0] - goal[0]) + abs(node[1] - goal[1])
+
+WORKLOADS = {
+	'road': (grid_road_map, manhattan),
+	'grid': (obstacle_grid, octile)}
+
+def engines_for(names, time_map, estimate, grid=None):
+	# each engine is (preprocess, search), preprocess returns the search state
+	# jps only runs on grid workloads
+	engines = {
+		'astar': (lambda: MemoizedHeuristic(estimate),
+			lambda h, start, end: sc.a_star_search(h, time_map, start, end)),
+		'csr': (lambda: (MemoizedHeuristic(estimate), CSRGraph.from_map(time_map)),
+			lambda state, start, end: sc.a_star_search_csr(state[0], state[1], start, end)),
+		'bidir': (lambda: (MemoizedHeuristic(estimate), MemoizedHeuristic(estimate), reverse_map(time_map)),
+			lambda state, start, end: sc.bidirectional_a_star_search(state[0], time_map, start, end, state[2], state[1])),
+		'weighted': (lambda: MemoizedHeuristic(estimate),
+			lambda h, start, end: sc.weighted_a_star_search(h, time_map, start, end, weight=2)),
+		'alt': (lambda: LandmarkHeuristic.build(time_map, k=8),
+			lambda h, start, end: sc.a_star_search(h, time_map, start, end)),
+		'ch': (lambda: ContractionHierarchy.build(time_map),
+			lambda hierarchy, start, end: hierarchy.search(start, end)),
+		'jps': (lambda: grid,
+			lambda grid, start, end: jump_point_search(grid, start, end))}
+	return [(name,) + engines[name] for name in names if name != 'jps' or grid is not None]
+
+# results table printed by main
+HEADER = '{:>6} {:>9} {:>8} {:>10} {:>10} {:>10} {:>12}'.format(
+	'graph', 'nodes', 'engine', 'prep s', 'query s', 'expanded', 'peak bytes')
+ROW = ('{workload:>6} {nodes:>9} {engine:>8} {preprocess_seconds:>10.3f} {mean_query_seconds:>10.4f} '
+	'{expanded:>10} {query_peak_bytes:>12}')
+
+def run(workloads, sizes, engine_names, queries, seed, verbose=False):
+	"""
+	Times every engine on every workload and size
+
+	Parameters:
+	workloads (List): workload names from WORKLOADS
+	sizes (List): approximate node counts
+	engine_names (List): engines to run, see engines_for
+	queries (Int): random start/end pairs per graph
+	seed (Int): seed of the graphs and the queries
+	verbose (Boolean): print each result as soon as it is measured
+
+	Returns:
+	List: one Dict of results per workload, size and engine
+	"""
+	results = []
+	for workload in workloads:
+		generate, estimate = WORKLOADS[workload]
+		for size in sizes:
+			side = int(round(size ** 0.5))
+			graph = generate(side, seed=seed)
+			grid = graph if isinstance(graph, OccupancyGrid) else None
+			time_map = grid.to_time_map() if grid is not None else graph
+			nodes = sorted(time_map)
+			rng = random.Random(seed)
+			pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(queries)]
+			for engine, preprocess, search in engines_for(engine_names, time_map, estimate, grid):
+				started = time.perf_counter()
+				state = preprocess()
+				preprocess_time = time.perf_counter() - started
+
+				times = []
+				expanded = 0
+				found = 0
+				for start, end in pairs:
+					expand.expand_count = 0
+					started = time.perf_counter()
+					path = search(state, start, end)
+					times.append(time.perf_counter() - started)
+					expanded += expand.expand_count
+					found += bool(path)
+
+				# memory is traced on a separate run, tracing slows the search down
+				tracemalloc.start()
+				search(state, *pairs[0])
+				peak_memory = tracemalloc.get_traced_memory()[1]
+				tracemalloc.stop()
+
+				record = {
+					'workload': workload,
+					'nodes': len(time_map),
+					'engine': engine,
+					'queries': queries,
+					'paths_found': found,
+					'preprocess_seconds': preprocess_time,
+					'mean_query_seconds': statistics.mean(times),
+					'median_query_seconds': statistics.median(times),
+					'expanded': expanded,
+					'query_peak_bytes': peak_memory}
+				results.append(record)
+				if verbose:
+					print(ROW.format(**record))
+	return results
+
+def regressions(results, baseline, tolerance):
+	"""
+	Compares results with a baseline run
+
+	Parameters:
+	results (List): records returned by run
+	baseline (List): records of an earlier run
+	tolerance (Float): allowed relative slowdown of the mean query time
+
+	Returns:
+	List: descriptions of the regressions found
+	"""
+	previous = {(r['workload'], r['nodes'], r['engine'], r['queries']): r for r in baseline}
+	found = []
+	for record in results:
+		key = (record['workload'], record['nodes'], record['engine'], record['queries'])
+		if key not in previous:
+			continue
+		old = previous[key]
+		name = '{} {} nodes {}'.format(record['workload'], record['nodes'], record['engine'])
+		if record['expanded'] > old['expanded']:
+			found.append('{}: expanded {} > {}'.format(name, record['expanded'], old['expanded']))
+		if record['mean_query_seconds'] > old['mean_query_seconds'] * (1 + tolerance):
+			found.append('{}: mean query {:.4f}s > {:.4f}s'.format(
+				name, record['mean_query_seconds'], old['mean_query_seconds']))
+	return found
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark the A* search engines.')
+	parser.add_argument('sizes', nargs='*', type=int, default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6],
+		help='approximate node counts')
+	parser.add_argument('--workloads', nargs='+', default=sorted(WORKLOADS), choices=sorted(WORKLOADS))
+	parser.add_argument('--engines', nargs='+', default=['astar', 'csr', 'bidir', 'jps'],
+		choices=['astar', 'csr', 'bidir', 'weighted', 'alt', 'ch', 'jps'],
+		help='alt and ch preprocess the whole graph first, jps only runs on grid workloads')
+	parser.add_argument('--queries', type=int, default=5)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', help='write the results as JSON to this file')
+	parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+	parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown')
+	args = parser.parse_args(argv)
+
+	# large graphs take a while, so rows are printed as they come
+	print(HEADER)
+	results = run(args.workloads, args.sizes, args.engines, args.queries, args.seed, verbose=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=1)
+	if args.baseline:
+		with open(args.baseline) as f:
+			found = regressions(results, json.load(f), args.tolerance)
+		for line in found:
+			print('REGRESSION', line)
+		return 1 if found else 0
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
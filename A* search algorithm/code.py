@@ -1,29 +1,68 @@
-from expand import expand
-import heapq as minheap
+import time
+from array import array
+from expand import expand, expand_csr
+from graph import reverse_map
+from heuristics import WeightedHeuristic, as_heuristic
+from priority_queue import IndexedMinHeap
+from search_stats import SearchStats
 
-def a_star_search (dis_map, time_map, start, end):
+def reconstruct_path(parent, node):
+	# follow parent pointers back to the start node
 	path = []
+	while node is not None:
+		path.append(node)
+		node = parent[node]
+	path.reverse()
+	return path
+
+def a_star_search (dis_map, time_map, start, end, stats=None, callback=None, sample_every=1):
+	# dis_map may be a dis_map[node][end] table or any heuristic provider
+	# stats (SearchStats) collects the counters of this search when given
+	# callback(expanded, open size) samples the frontier every sample_every expansions
+	started = time.perf_counter()
+	open_nodes = IndexedMinHeap()
+	path, expanded = _a_star_search(as_heuristic(dis_map), time_map, start, end, open_nodes, callback, sample_every)
+	if stats is not None:
+		stats.record(open_nodes, expanded, time.perf_counter() - started)
+	return path
+
+def a_star_search_with_stats (dis_map, time_map, start, end, callback=None, sample_every=1):
+	# same as a_star_search, also returns the SearchStats of the query
+	stats = SearchStats()
+	path = a_star_search(dis_map, time_map, start, end, stats, callback, sample_every)
+	return path, stats
+
+def weighted_a_star_search (dis_map, time_map, start, end, weight=2, stats=None):
+	# a_star_search ordered by f = g + weight * h, it usually expands far
+	# fewer nodes and returns a path costing at most weight times the optimum
+	return a_star_search(WeightedHeuristic(as_heuristic(dis_map), weight), time_map, start, end, stats)
+
+def _a_star_search (heuristic, time_map, start, end, open_nodes, callback, sample_every):
+	# returns the path and the number of expanded nodes
+	path = []
+	expanded = 0
 	# be sure to call the imported function expand to get the next list of nodes
-	open_nodes = []
-	closed_nodes = []
+	# open_nodes orders nodes by (total cost, name) and supports decrease-key
+	closed_nodes = set()
 	node_expansion_dict = {}
-	node_path_dict = {}
+	# parent pointer of each reached node, the path is rebuilt once at the end
+	parent = {}
+	# cost of the best known path to each open node
+	g_costs = {}
 
 	# check if start or end in the map
-	if start not in dis_map or end not in dis_map:
-		return path
+	if start not in heuristic or end not in heuristic:
+		return path, expanded
 
 	# initialization
-	node = [dis_map[start][end], start]
-	minheap.heappush(open_nodes, node)
-	node_path_dict[start] = tuple(path)
+	open_nodes.push(start, heuristic(start, end))
+	parent[start] = None
+	g_costs[start] = 0
 
-	while open_nodes[0][1] != end:
+	while open_nodes.peek()[1] != end:
 		# choose a node with minimum expected cost
 		# break ties alphabetically if nodes have the same expected cost
-		node = minheap.heappop(open_nodes)
-		path = list(node_path_dict[node[1]])
-		path.append(node[1])
+		node = open_nodes.pop()
 
 		# expand this node to get the next list of nodes
 		if node[1] in node_expansion_dict:
@@ -32,46 +71,241 @@ def a_star_search (dis_map, time_map, start, end):
 			# if cost of node is not available
 			# choose another node with minimum expected cost
 			if node[1] not in time_map:
-				closed_nodes.append(node[1])
+				closed_nodes.add(node[1])
+				# if there is nowhere to go before reaching end
+				if len(open_nodes) == 0:
+					return [], expanded
 				continue
 			next_node_list = expand(node[1], time_map)
 			node_expansion_dict[node[1]] = next_node_list
+			expanded += 1
+			if callback is not None and expanded % sample_every == 0:
+				callback(expanded, len(open_nodes))
 
 		for next_node in next_node_list:
 			# if the expanded node not in closed_nodes
 			# and its heuristic cost is available (in dis_map)
-			if next_node not in closed_nodes and next_node in dis_map:
+			if next_node not in closed_nodes and next_node in heuristic:
 				# evaluate total cost
-				g_cost = (node[0] - dis_map[node[1]][end]) + time_map[node[1]][next_node]
-				h_cost = dis_map[next_node][end]
+				g_cost = g_costs[node[1]] + time_map[node[1]][next_node]
+				h_cost = heuristic(next_node, end)
 				total_cost = g_cost + h_cost
-				for i in range(len(open_nodes)):
-					if next_node == open_nodes[i][1]:
-						# if the node's total cost can be updated
-						if total_cost < open_nodes[i][0]:
-							# update total cost
-							open_nodes[i][0] = total_cost
-							# update path
-							node_path_dict[next_node] = tuple(path)
-							# maintain heap structure
-							minheap.heapify(open_nodes)
-						break
+				if next_node in open_nodes:
+					# if the node's total cost can be updated
+					if total_cost < open_nodes.priority(next_node):
+						# update total cost and maintain heap structure
+						open_nodes.decrease_key(next_node, total_cost)
+						g_costs[next_node] = g_cost
+						# update path
+						parent[next_node] = node[1]
 				else:
 					# push the expanded node in open_nodes
-					minheap.heappush(open_nodes, [total_cost, next_node])
+					open_nodes.push(next_node, total_cost)
+					g_costs[next_node] = g_cost
 					# if path to the expanded node does not exist
-					if next_node not in node_path_dict:
-						node_path_dict[next_node] = tuple(path)
+					if next_node not in parent:
+						parent[next_node] = node[1]
 
 		# add used node to closed_nodes
-		closed_nodes.append(node[1])
+		closed_nodes.add(node[1])
 		# if there is nowhere to go before reaching end
 		if len(open_nodes) == 0:
-			return []
+			return [], expanded
+
+	# rebuild the path to the final node
+	node = open_nodes.pop()
+	closed_nodes.add(node[1])
+	return reconstruct_path(parent, node[1]), expanded
+
+def bidirectional_a_star_search (dis_map, time_map, start, end, reversed_map=None, reverse_heuristic=None):
+	# A* forward from start over time_map and backward from end over the
+	# reversed edges, alternating on the side with the smaller open list
+	# pass reversed_map (graph.reverse_map(time_map)) to reuse it across queries
+	# reverse_heuristic(node, start) bounds the cost from start to node, it
+	# defaults to heuristic.reversed() so each direction keeps a fixed goal
+	heuristic = as_heuristic(dis_map)
+	if reverse_heuristic is None:
+		reverse_heuristic = heuristic.reversed()
+	else:
+		reverse_heuristic = as_heuristic(reverse_heuristic)
+	if start not in heuristic or end not in heuristic:
+		return []
+	if start == end:
+		return [start]
+	if reversed_map is None:
+		reversed_map = reverse_map(time_map)
 
-	# append the final node to path
-	node = minheap.heappop(open_nodes)
-	closed_nodes.append(node[1])
-	path = list(node_path_dict[node[1]])
-	path.append(node[1])
+	# average potential p(v) = (h(v, end) - h_r(v, start)) / 2, the forward side
+	# orders nodes by g + p and the backward side by g - p, so both sides see
+	# the same reduced edge costs and meet in the middle
+	potentials = {}
+	def potential(node):
+		if node not in potentials:
+			potentials[node] = (heuristic(node, end) - reverse_heuristic(node, start)) / 2
+		return potentials[node]
+
+	forward = {'map': time_map, 'sign': 1}
+	backward = {'map': reversed_map, 'sign': -1}
+	for side, root in ((forward, start), (backward, end)):
+		side['open'] = IndexedMinHeap()
+		side['g'] = {root: 0}
+		side['parent'] = {root: None}
+		side['open'].push(root, side['sign'] * potential(root))
+
+	# cost of the best path found so far and the node where both sides meet
+	best_cost = float('inf')
+	meeting_node = None
+
+	while len(forward['open']) > 0 and len(backward['open']) > 0:
+		# stopping criterion of bidirectional search on reduced costs:
+		# no path through the open nodes can be cheaper than best_cost
+		if forward['open'].peek()[0] + backward['open'].peek()[0] >= best_cost:
+			break
+		side, other = (forward, backward) if len(forward['open']) <= len(backward['open']) else (backward, forward)
+		node = side['open'].pop()[1]
+		if node not in side['map']:
+			continue
+
+		g_costs = side['g']
+		for next_node in expand(node, side['map']):
+			if next_node not in heuristic:
+				continue
+			g_cost = g_costs[node] + side['map'][node][next_node]
+			# both sides have reached next_node
+			if next_node in other['g'] and g_cost + other['g'][next_node] < best_cost:
+				best_cost = g_cost + other['g'][next_node]
+				meeting_node = next_node
+			if next_node in g_costs and g_cost >= g_costs[next_node]:
+				continue
+			g_costs[next_node] = g_cost
+			side['parent'][next_node] = node
+			total_cost = g_cost + side['sign'] * potential(next_node)
+			if next_node in side['open']:
+				side['open'].decrease_key(next_node, total_cost)
+			else:
+				# nodes are reopened when a cheaper path is found
+				side['open'].push(next_node, total_cost)
+
+	if meeting_node is None:
+		return []
+	path = reconstruct_path(forward['parent'], meeting_node)
+	node = backward['parent'][meeting_node]
+	while node is not None:
+		path.append(node)
+		node = backward['parent'][node]
 	return path
+
+def a_star_search_csr (dis_map, graph, start, end, stats=None, callback=None, sample_every=1):
+	# same search as a_star_search over a CSRGraph
+	# node ids are interned in name order, so (cost, id) breaks ties alphabetically
+	started = time.perf_counter()
+	open_nodes = IndexedMinHeap()
+	path, expanded = _a_star_search_csr(as_heuristic(dis_map), graph, start, end, open_nodes, callback, sample_every)
+	if stats is not None:
+		stats.record(open_nodes, expanded, time.perf_counter() - started)
+	return path
+
+def _a_star_search_csr (heuristic, graph, start, end, open_nodes, callback, sample_every):
+	# returns the path and the number of expanded nodes
+	expanded = 0
+	if start not in heuristic or end not in heuristic:
+		return [], expanded
+	if start not in graph or end not in graph:
+		return ([start] if start == end else []), expanded
+
+	names = graph.names
+	targets = graph.targets
+	weights = graph.weights
+	has_row = graph.has_row
+	start_id = graph.id_of(start)
+	end_id = graph.id_of(end)
+
+	closed_nodes = bytearray(len(graph))
+	parent = array('i', [-1]) * len(graph)
+	g_costs = array('d', [0]) * len(graph)
+	# heuristic cost of each node, looked up once by name
+	h_costs = {}
+
+	h_costs[start_id] = heuristic(start, end)
+	open_nodes.push(start_id, h_costs[start_id])
+
+	while open_nodes.peek()[1] != end_id:
+		node = open_nodes.pop()[1]
+		closed_nodes[node] = 1
+		if not has_row[node]:
+			if len(open_nodes) == 0:
+				return [], expanded
+			continue
+
+		g_node = g_costs[node]
+		edges = expand_csr(node, graph)
+		expanded += 1
+		if callback is not None and expanded % sample_every == 0:
+			callback(expanded, len(open_nodes))
+		for e in edges:
+			next_node = targets[e]
+			if closed_nodes[next_node]:
+				continue
+			if next_node in h_costs:
+				h_cost = h_costs[next_node]
+			else:
+				# None marks a node without heuristic cost (not in dis_map)
+				next_name = names[next_node]
+				h_cost = heuristic(next_name, end) if next_name in heuristic else None
+				h_costs[next_node] = h_cost
+			if h_cost is None:
+				continue
+			g_cost = g_node + weights[e]
+			total_cost = g_cost + h_cost
+			if next_node in open_nodes:
+				if total_cost < open_nodes.priority(next_node):
+					open_nodes.decrease_key(next_node, total_cost)
+					g_costs[next_node] = g_cost
+					parent[next_node] = node
+			else:
+				open_nodes.push(next_node, total_cost)
+				g_costs[next_node] = g_cost
+				parent[next_node] = node
+
+		if len(open_nodes) == 0:
+			return [], expanded
+
+	path = []
+	node = end_id
+	while node != -1:
+		path.append(names[node])
+		node = parent[node]
+	path.reverse()
+	return path, expanded
+
+def dijkstra (time_map, source, targets=None):
+	# exact path costs from source to every reachable node of time_map
+	# stops once all targets are settled when targets is given
+	# does not count towards expand.expand_count, it is used for preprocessing
+	dist = {}
+	parent = {source: None}
+	open_nodes = IndexedMinHeap()
+	open_nodes.push(source, 0)
+	remaining = set(targets) if targets is not None else None
+
+	while len(open_nodes) > 0:
+		cost, node = open_nodes.pop()
+		dist[node] = cost
+		if remaining is not None:
+			remaining.discard(node)
+			if not remaining:
+				break
+		if node not in time_map:
+			continue
+		for next_node, travel_time in time_map[node].items():
+			if travel_time is None or next_node in dist:
+				continue
+			total_cost = cost + travel_time
+			if next_node in open_nodes:
+				if total_cost < open_nodes.priority(next_node):
+					open_nodes.decrease_key(next_node, total_cost)
+					parent[next_node] = node
+			else:
+				open_nodes.push(next_node, total_cost)
+				parent[next_node] = node
+	return dist, parent
@@ -0,0 +1,273 @@
+import heapq as minheap
+import pickle
+
+from expand import expand
+from priority_queue import IndexedMinHeap
+
+INF = float('inf')
+
+class ContractionHierarchy:
+	"""
+	Contraction hierarchy over a time_map graph
+
+	Nodes are contracted one at a time in order of importance; shortcuts keep
+	the shortest path costs between the remaining nodes. A query runs two
+	small Dijkstra searches that only climb to more important nodes and
+	unpacks the shortcuts on the best meeting path.
+
+	Attributes:
+		rank (Dict): contraction order of each node
+		upward (Dict): upward[u][v], cost of edge u -> v with rank[v] > rank[u]
+		downward (Dict): downward[v][u], cost of edge u -> v with rank[u] > rank[v]
+		middle (Dict): middle[(u, v)], node bypassed by shortcut u -> v
+	"""
+	def __init__(self, rank, upward, downward, middle):
+		self.rank = rank
+		self.upward = upward
+		self.downward = downward
+		self.middle = middle
+
+	@classmethod
+	def build(cls, time_map, witness_limit=64):
+		"""
+		Contracts every node of time_map
+
+		Parameters:
+		time_map (Dict): travel times, missing edges may be stored as None
+		witness_limit (Int): nodes settled per witness search before giving up
+			and adding the shortcut, a lower limit builds faster but adds
+			unnecessary shortcuts
+
+		Returns:
+		ContractionHierarchy
+		"""
+		# remaining graph, parallel edges keep the cheapest cost
+		out_edges = {}
+		in_edges = {}
+		for node in time_map:
+			out_edges.setdefault(node, {})
+			in_edges.setdefault(node, {})
+			for next_node, time in time_map[node].items():
+				if time is None or next_node == node:
+					continue
+				out_edges.setdefault(next_node, {})
+				in_edges.setdefault(next_node, {})
+				if time < out_edges[node].get(next_node, INF):
+					out_edges[node][next_node] = time
+					in_edges[next_node][node] = time
+
+		builder = _Contraction(out_edges, in_edges, witness_limit)
+		return cls(*builder.run())
+
+	def save(self, path):
+		with open(path, 'wb') as f:
+			pickle.dump((self.rank, self.upward, self.downward, self.middle), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+	@classmethod
+	def load(cls, path):
+		"""
+		Loads a hierarchy written by save, only load files from trusted sources
+
+		Parameters:
+		path (String): path of the saved hierarchy
+
+		Returns:
+		ContractionHierarchy
+		"""
+		with open(path, 'rb') as f:
+			return cls(*pickle.load(f))
+
+	def __contains__(self, node):
+		return node in self.rank
+
+	def search(self, start, end):
+		"""
+		Finds a shortest path with a bidirectional upward search. The path
+		costs the same as the one a_star_search finds, but among paths of
+		equal cost it may be a different one.
+
+		Expansions are counted in expand.expand_count like a_star_search.
+
+		Parameters:
+		start (Hashable): start node
+		end (Hashable): end node
+
+		Returns:
+		List: nodes of a shortest path, empty if there is none
+		"""
+		if start not in self.rank or end not in self.rank:
+			return []
+		if start == end:
+			return [start]
+
+		forward = {'map': self.upward}
+		backward = {'map': self.downward}
+		for side, root in ((forward, start), (backward, end)):
+			side['open'] = IndexedMinHeap()
+			side['open'].push(root, 0)
+			side['g'] = {root: 0}
+			side['parent'] = {root: None}
+
+		best_cost = INF
+		meeting_node = None
+		while True:
+			# each side stops once it cannot improve on best_cost
+			for side in (forward, backward):
+				if len(side['open']) > 0 and side['open'].peek()[0] >= best_cost:
+					side['open'] = IndexedMinHeap()
+			if len(forward['open']) == 0 and len(backward['open']) == 0:
+				break
+			if len(backward['open']) == 0 or (len(forward['open']) > 0
+					and forward['open'].peek()[0] <= backward['open'].peek()[0]):
+				side, other = forward, backward
+			else:
+				side, other = backward, forward
+			g_node, node = side['open'].pop()
+			if node in other['g'] and g_node + other['g'][node] < best_cost:
+				best_cost = g_node + other['g'][node]
+				meeting_node = node
+			for next_node in expand(node, side['map']):
+				g_cost = g_node + side['map'][node][next_node]
+				if g_cost < side['g'].get(next_node, INF):
+					side['g'][next_node] = g_cost
+					side['parent'][next_node] = node
+					if next_node in side['open']:
+						side['open'].decrease_key(next_node, g_cost)
+					else:
+						side['open'].push(next_node, g_cost)
+					if next_node in other['g'] and g_cost + other['g'][next_node] < best_cost:
+						best_cost = g_cost + other['g'][next_node]
+						meeting_node = next_node
+
+		if meeting_node is None:
+			return []
+		# hierarchy edges from start to the meeting node and on to end
+		nodes = []
+		node = meeting_node
+		while node is not None:
+			nodes.append(node)
+			node = forward['parent'][node]
+		nodes.reverse()
+		node = backward['parent'][meeting_node]
+		while node is not None:
+			nodes.append(node)
+			node = backward['parent'][node]
+
+		path = [start]
+		for i in range(len(nodes) - 1):
+			path.extend(self.unpack(nodes[i], nodes[i + 1])[1:])
+		return path
+
+	def unpack(self, u, v):
+		"""
+		Expands an edge of the hierarchy into the original path
+
+		Parameters:
+		u (Hashable): tail of the edge
+		v (Hashable): head of the edge
+
+		Returns:
+		List: nodes from u to v in the original graph
+		"""
+		path = [u]
+		stack = [v]
+		while stack:
+			w = stack[-1]
+			if (u, w) in self.middle:
+				stack.append(self.middle[(u, w)])
+			else:
+				path.append(w)
+				u = stack.pop()
+		return path
+
+class _Contraction:
+	# node ordering and shortcut insertion state used by ContractionHierarchy.build
+	def __init__(self, out_edges, in_edges, witness_limit):
+		self.out_edges = out_edges
+		self.in_edges = in_edges
+		self.witness_limit = witness_limit
+		self.contracted_neighbors = dict.fromkeys(out_edges, 0)
+
+	def witness_costs(self, source, skip, targets):
+		# tentative costs from source in the remaining graph, avoiding skip,
+		# until every target is settled or no witness can be cheaper than
+		# its shortcut; every value is the cost of a real path
+		max_cost = max(targets.values())
+		remaining = set(targets)
+		dist = {source: 0}
+		# plain heap with stale entries skipped, cheaper than decrease-key here
+		open_nodes = [(0, source)]
+		settled = set()
+		while open_nodes and len(settled) < self.witness_limit:
+			cost, node = minheap.heappop(open_nodes)
+			if node in settled:
+				continue
+			if cost > max_cost:
+				break
+			remaining.discard(node)
+			if not remaining:
+				break
+			settled.add(node)
+			for next_node, time in self.out_edges[node].items():
+				if next_node == skip:
+					continue
+				total_cost = cost + time
+				if total_cost < dist.get(next_node, INF):
+					dist[next_node] = total_cost
+					minheap.heappush(open_nodes, (total_cost, next_node))
+		return dist
+
+	def shortcuts(self, node):
+		# (u, w, cost) for every path u -> node -> w without a witness
+		result = []
+		out_edges = self.out_edges[node]
+		for u, time_in in self.in_edges[node].items():
+			costs = {w: time_in + time_out for w, time_out in out_edges.items() if w != u}
+			if not costs:
+				continue
+			dist = self.witness_costs(u, node, costs)
+			for w, cost in costs.items():
+				if dist.get(w, INF) > cost:
+					result.append((u, w, cost))
+		return result
+
+	def priority(self, node):
+		# edge difference plus contracted neighbors keeps the hierarchy flat
+		# the shortcuts are kept for contracting the node right away
+		self.pending = (node, self.shortcuts(node))
+		return (len(self.pending[1]) - len(self.in_edges[node]) - len(self.out_edges[node])
+			+ self.contracted_neighbors[node])
+
+	def run(self):
+		queue = IndexedMinHeap()
+		for node in self.out_edges:
+			queue.push(node, self.priority(node))
+
+		rank = {}
+		upward = {}
+		downward = {}
+		middle = {}
+		while len(queue) > 0:
+			node = queue.pop()[1]
+			# lazy update, contract node only if it is still the least important
+			priority = self.priority(node)
+			if len(queue) > 0 and priority > queue.peek()[0]:
+				queue.push(node, priority)
+				continue
+
+			for u, w, cost in self.pending[1]:
+				if cost < self.out_edges[u].get(w, INF):
+					self.out_edges[u][w] = cost
+					self.in_edges[w][u] = cost
+					middle[(u, w)] = node
+
+			rank[node] = len(rank)
+			upward[node] = self.out_edges.pop(node)
+			downward[node] = self.in_edges.pop(node)
+			for w in upward[node]:
+				del self.in_edges[w][node]
+				self.contracted_neighbors[w] += 1
+			for u in downward[node]:
+				del self.out_edges[u][node]
+				self.contracted_neighbors[u] += 1
+		return rank, upward, downward, middle
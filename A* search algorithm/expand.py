@@ -3,4 +3,10 @@ expand_count = 0
 def expand(node, _map): 
 	global expand_count
 	expand_count = expand_count + 1
-	return [next for next in _map[node] if _map[node][next] is not None]
\ No newline at end of file
+	return [next for next in _map[node] if _map[node][next] is not None]
+
+def expand_csr(node, graph):
+	# out-edges of node as a range of edge indexes into graph.targets/weights
+	global expand_count
+	expand_count = expand_count + 1
+	return range(graph.offsets[node], graph.offsets[node + 1])
@@ -0,0 +1,301 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# graph file layout, all sections little-endian and 8-byte aligned:
+# header (magic, version, node count, edge count, name bytes),
+# offsets int64[V + 1], targets int32[E], weights float64[E], has_row uint8[V],
+# name offsets int64[V + 1], utf-8 names in sorted order
+GRAPH_MAGIC = b'CSRG'
+GRAPH_VERSION = 1
+GRAPH_HEADER = struct.Struct('<4sIQQQ')
+
+class CSRGraph:
+	"""
+	Directed weighted graph in compressed sparse row form
+
+	Node names are interned to integer ids in sorted order, so comparing ids
+	is the same as comparing names. The out-edges of node i are the edge
+	indexes range(offsets[i], offsets[i + 1]) into targets and weights.
+	has_row[i] is 1 when node i is a source in the input map, which mirrors
+	`node in time_map` for the dict-of-dicts format.
+	"""
+	def __init__(self, names, offsets, targets, weights, has_row, index=None):
+		self.names = names
+		self.index = index if index is not None else {name: i for i, name in enumerate(names)}
+		self.offsets = offsets
+		self.targets = targets
+		self.weights = weights
+		self.has_row = has_row
+
+	def __len__(self):
+		return len(self.names)
+
+	def __contains__(self, name):
+		return name in self.index
+
+	def edge_count(self):
+		return len(self.targets)
+
+	def id_of(self, name):
+		"""
+		Gets the integer id of a node
+
+		Parameters:
+		name (Hashable): name of the node
+
+		Returns:
+		Int, or None if the node is not in the graph
+		"""
+		return self.index.get(name)
+
+	def name_of(self, node):
+		return self.names[node]
+
+	def neighbors(self, node):
+		"""
+		Iterates over the out-edges of a node
+
+		Parameters:
+		node (Int): id of the node
+
+		Returns:
+		Iterator of (Int, Float): target id and edge weight
+		"""
+		targets = self.targets
+		weights = self.weights
+		for e in range(self.offsets[node], self.offsets[node + 1]):
+			yield targets[e], weights[e]
+
+	def save(self, path):
+		"""
+		Writes the graph in the binary format read by MappedGraph
+
+		Parameters:
+		path (String): path of the graph file, node names must be strings
+
+		Returns:
+		None
+		"""
+		if sys.byteorder != 'little':
+			raise ValueError('graph files are written on little-endian machines only')
+		encoded = []
+		for name in self.names:
+			if not isinstance(name, str):
+				raise ValueError('graph files need string node names, got {!r}'.format(name))
+			encoded.append(name.encode('utf-8'))
+		name_offsets = array('q', [0])
+		for name in encoded:
+			name_offsets.append(name_offsets[-1] + len(name))
+
+		with open(path, 'wb') as f:
+			f.write(GRAPH_HEADER.pack(GRAPH_MAGIC, GRAPH_VERSION, len(self.names), len(self.targets), name_offsets[-1]))
+			for section in (array('q', self.offsets), array('i', self.targets), array('d', self.weights),
+					bytes(self.has_row), name_offsets):
+				data = section.tobytes() if isinstance(section, array) else section
+				f.write(data)
+				f.write(b'\0' * (-len(data) % 8))
+			f.write(b''.join(encoded))
+
+	@classmethod
+	def from_edges(cls, edges, sources=()):
+		"""
+		Builds a graph from (source, target, weight) triples
+
+		Parameters:
+		edges (Iterable): (source, target, weight) triples, weight None is skipped
+		sources (Iterable): names of extra nodes that have a (possibly empty) row
+
+		Returns:
+		CSRGraph
+		"""
+		rows = {}
+		for name in sources:
+			rows.setdefault(name, [])
+		nodes = set(rows)
+		for source, target, weight in edges:
+			if weight is None:
+				continue
+			rows.setdefault(source, []).append((target, weight))
+			nodes.add(source)
+			nodes.add(target)
+
+		names = sorted(nodes)
+		index = {name: i for i, name in enumerate(names)}
+		offsets = array('q', [0])
+		targets = array('i')
+		weights = array('d')
+		has_row = bytearray(len(names))
+		for i, name in enumerate(names):
+			row = rows.pop(name, None)
+			if row is not None:
+				has_row[i] = 1
+				row = sorted((index[target], weight) for target, weight in row)
+				targets.extend(target for target, _ in row)
+				weights.extend(weight for _, weight in row)
+			offsets.append(len(targets))
+		return cls(names, offsets, targets, weights, has_row, index)
+
+	@classmethod
+	def from_map(cls, time_map):
+		"""
+		Builds a graph from a time_map[node][next] dict of dicts
+
+		Parameters:
+		time_map (Dict): travel times, missing edges may be stored as None
+
+		Returns:
+		CSRGraph
+		"""
+		edges = ((node, next, time_map[node][next]) for node in time_map for next in time_map[node])
+		return cls.from_edges(edges, sources=time_map)
+
+	@classmethod
+	def from_edge_list(cls, path):
+		"""
+		Builds a graph from a text file with one "source target weight" per line
+
+		Blank lines and lines starting with # are ignored.
+
+		Parameters:
+		path (String): path of the edge list file
+
+		Returns:
+		CSRGraph
+		"""
+		def read_edges(f):
+			for line in f:
+				fields = line.split()
+				if not fields or fields[0].startswith('#'):
+					continue
+				yield fields[0], fields[1], float(fields[2])
+
+		with open(path) as f:
+			return cls.from_edges(read_edges(f))
+
+class _NameTable:
+	# sequence of node names decoded on access from the mapped name section
+	def __init__(self, offsets, data):
+		self.offsets = offsets
+		self.data = data
+
+	def __len__(self):
+		return len(self.offsets) - 1
+
+	def __getitem__(self, i):
+		return self.encoded(i).decode('utf-8')
+
+	def encoded(self, i):
+		return bytes(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+class MappedGraph(CSRGraph):
+	"""
+	CSRGraph backed by a memory-mapped graph file written by CSRGraph.save
+
+	Opening only maps the file, sections are read lazily by the OS and the
+	pages are shared by every process that maps the same file. Names are
+	stored sorted, so id_of is a binary search and needs no index dict.
+	"""
+	def __init__(self, path):
+		if sys.byteorder != 'little':
+			raise ValueError('graph files are read on little-endian machines only')
+		with open(path, 'rb') as f:
+			if os.fstat(f.fileno()).st_size < GRAPH_HEADER.size:
+				raise ValueError('{} is too short to be a graph file'.format(path))
+			self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self.view = None
+		views = []
+		try:
+			magic, version, node_count, edge_count, name_bytes = GRAPH_HEADER.unpack_from(self.mmap)
+			if magic != GRAPH_MAGIC or version != GRAPH_VERSION:
+				raise ValueError('{} is not a version {} graph file'.format(path, GRAPH_VERSION))
+			sizes = [8 * (node_count + 1), 4 * edge_count, 8 * edge_count, node_count, 8 * (node_count + 1)]
+			expected = GRAPH_HEADER.size + sum(size + (-size % 8) for size in sizes) + name_bytes
+			if len(self.mmap) < expected:
+				raise ValueError('{} is truncated: {} bytes, the header needs {}'.format(path, len(self.mmap), expected))
+
+			self.view = memoryview(self.mmap)
+			views.append(self.view)
+			position = GRAPH_HEADER.size
+			def section(size, fmt):
+				nonlocal position
+				data = self.view[position:position + size]
+				views.append(data)
+				position += size + (-size % 8)
+				data = data.cast(fmt)
+				views.append(data)
+				return data
+			self.offsets, self.targets, self.weights, self.has_row, name_offsets = (
+				section(size, fmt) for size, fmt in zip(sizes, 'qidBq'))
+			name_data = self.view[position:position + name_bytes]
+			views.append(name_data)
+			self.names = _NameTable(name_offsets, name_data)
+		except Exception:
+			for view in reversed(views):
+				view.release()
+			self.mmap.close()
+			raise
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def close(self):
+		# views must be released before the map can be closed
+		for view in (self.offsets, self.targets, self.weights, self.has_row,
+				self.names.offsets, self.names.data, self.view):
+			view.release()
+		self.mmap.close()
+
+	def __contains__(self, name):
+		return self.id_of(name) is not None
+
+	def id_of(self, name):
+		if not isinstance(name, str):
+			return None
+		key = name.encode('utf-8')
+		low, high = 0, len(self.names)
+		while low < high:
+			mid = (low + high) // 2
+			if self.names.encoded(mid) < key:
+				low = mid + 1
+			else:
+				high = mid
+		if low < len(self.names) and self.names.encoded(low) == key:
+			return low
+		return None
+
+def save_graph(time_map, path):
+	"""
+	Converts a time_map (or a CSRGraph) into a graph file for MappedGraph
+
+	Parameters:
+	time_map (Dict|CSRGraph): travel times, missing edges may be stored as None
+	path (String): path of the graph file
+
+	Returns:
+	None
+	"""
+	graph = time_map if isinstance(time_map, CSRGraph) else CSRGraph.from_map(time_map)
+	graph.save(path)
+
+def reverse_map(time_map):
+	"""
+	Reverses every edge of a time_map
+
+	Parameters:
+	time_map (Dict): travel times, missing edges may be stored as None
+
+	Returns:
+	Dict: reversed[next][node] == time_map[node][next], without None entries
+	"""
+	reversed_map = {node: {} for node in time_map}
+	for node in time_map:
+		for next_node, time in time_map[node].items():
+			if time is not None:
+				reversed_map.setdefault(next_node, {})[node] = time
+	return reversed_map
@@ -0,0 +1,243 @@
+import math
+import random
+
+import expand
+from priority_queue import IndexedMinHeap
+
+SQRT2 = math.sqrt(2)
+
+def octile(node, goal):
+	# exact cost of an obstacle-free 8-connected move sequence
+	dr = abs(node[0] - goal[0])
+	dc = abs(node[1] - goal[1])
+	return max(dr, dc) + (SQRT2 - 1) * min(dr, dc)
+
+class OccupancyGrid:
+	"""
+	Bit-packed occupancy grid of (row, column) cells, one bit per cell
+
+	Moves go to the 8 neighboring cells, straight moves cost 1 and diagonal
+	moves sqrt(2). A diagonal move needs both cells it passes between to be
+	free, so paths never cut corners of blocked cells.
+	"""
+	def __init__(self, rows, cols):
+		self.rows = rows
+		self.cols = cols
+		self.bits = bytearray((rows * cols + 7) // 8)
+
+	@classmethod
+	def from_strings(cls, lines, blocked='#'):
+		"""
+		Builds a grid from text rows, blocked cells marked by the blocked character
+
+		Parameters:
+		lines (List of String): rows of the grid, all of the same length
+		blocked (String): character of a blocked cell
+
+		Returns:
+		OccupancyGrid
+		"""
+		grid = cls(len(lines), len(lines[0]) if lines else 0)
+		for r, line in enumerate(lines):
+			for c, cell in enumerate(line):
+				if cell == blocked:
+					grid.set_blocked(r, c)
+		return grid
+
+	@classmethod
+	def random(cls, rows, cols, density=0.2, seed=0):
+		# every cell is blocked with probability density
+		rng = random.Random(seed)
+		grid = cls(rows, cols)
+		for r in range(rows):
+			for c in range(cols):
+				if rng.random() < density:
+					grid.set_blocked(r, c)
+		return grid
+
+	def set_blocked(self, r, c, blocked=True):
+		i = r * self.cols + c
+		if blocked:
+			self.bits[i >> 3] |= 1 << (i & 7)
+		else:
+			self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xff
+
+	def passable(self, r, c):
+		# cells outside the grid are blocked
+		if r < 0 or c < 0 or r >= self.rows or c >= self.cols:
+			return False
+		i = r * self.cols + c
+		return not self.bits[i >> 3] >> (i & 7) & 1
+
+	def neighbors(self, r, c):
+		"""
+		Iterates over the moves from a cell
+
+		Parameters:
+		r (Int): row of the cell
+		c (Int): column of the cell
+
+		Returns:
+		Iterator of ((Int, Int), Float): neighboring cell and move cost
+		"""
+		for dr in (-1, 0, 1):
+			for dc in (-1, 0, 1):
+				if (dr or dc) and self.passable(r + dr, c + dc):
+					if dr and dc:
+						if self.passable(r + dr, c) and self.passable(r, c + dc):
+							yield (r + dr, c + dc), SQRT2
+					else:
+						yield (r + dr, c + dc), 1
+
+	def to_time_map(self):
+		"""
+		Converts the free cells into a time_map for a_star_search
+
+		Returns:
+		Dict: time_map[(r, c)][(r2, c2)], cost of every move
+		"""
+		return {(r, c): dict(self.neighbors(r, c))
+			for r in range(self.rows) for c in range(self.cols) if self.passable(r, c)}
+
+def jump_point_search(grid, start, end):
+	"""
+	Jump Point Search (JPS) on an OccupancyGrid
+
+	A* that only expands jump points: straight and diagonal runs are
+	scanned without queuing the symmetric cells in between, and stop at
+	cells with forced neighbors. Paths cost the same as a_star_search with
+	the octile heuristic on grid.to_time_map(). Every expanded jump point
+	counts towards expand.expand_count.
+
+	Parameters:
+	grid (OccupancyGrid): the grid
+	start (Tuple): (row, column) of the start cell
+	end (Tuple): (row, column) of the end cell
+
+	Returns:
+	List: every cell from start to end, empty if there is no path
+	"""
+	if not grid.passable(*start) or not grid.passable(*end):
+		return []
+	open_nodes = IndexedMinHeap()
+	open_nodes.push(start, octile(start, end))
+	g_costs = {start: 0}
+	parent = {start: None}
+	closed_nodes = set()
+
+	while len(open_nodes) > 0:
+		node = open_nodes.pop()[1]
+		if node == end:
+			return _interpolate(parent, end)
+		closed_nodes.add(node)
+		expand.expand_count += 1
+		for direction in _directions(grid, node, parent[node]):
+			jump_point = _jump(grid, node, direction, end)
+			if jump_point is None or jump_point in closed_nodes:
+				continue
+			g_cost = g_costs[node] + octile(node, jump_point)
+			if g_cost < g_costs.get(jump_point, float('inf')):
+				g_costs[jump_point] = g_cost
+				parent[jump_point] = node
+				total_cost = g_cost + octile(jump_point, end)
+				if jump_point in open_nodes:
+					open_nodes.decrease_key(jump_point, total_cost)
+				else:
+					open_nodes.push(jump_point, total_cost)
+	return []
+
+def _sign(x):
+	return (x > 0) - (x < 0)
+
+def _directions(grid, node, previous):
+	# pruned directions to scan from node when reached from previous
+	r, c = node
+	if previous is None:
+		return [(nr - r, nc - c) for (nr, nc), _ in grid.neighbors(r, c)]
+	dr = _sign(r - previous[0])
+	dc = _sign(c - previous[1])
+	passable = grid.passable
+	directions = []
+	if dr and dc:
+		if passable(r + dr, c):
+			directions.append((dr, 0))
+		if passable(r, c + dc):
+			directions.append((0, dc))
+		if passable(r + dr, c) and passable(r, c + dc):
+			directions.append((dr, dc))
+	elif dc:
+		# moving along a row
+		if passable(r, c + dc):
+			directions.append((0, dc))
+			for side in (-1, 1):
+				if passable(r + side, c):
+					directions.append((side, dc))
+		for side in (-1, 1):
+			if passable(r + side, c):
+				directions.append((side, 0))
+	else:
+		# moving along a column
+		if passable(r + dr, c):
+			directions.append((dr, 0))
+			for side in (-1, 1):
+				if passable(r, c + side):
+					directions.append((dr, side))
+		for side in (-1, 1):
+			if passable(r, c + side):
+				directions.append((0, side))
+	return directions
+
+def _jump_straight(grid, r, c, dr, dc, end):
+	# scans a row or column from (r, c), the first cell of the run
+	passable = grid.passable
+	while passable(r, c):
+		if (r, c) == end:
+			return (r, c)
+		if dc:
+			if ((passable(r - 1, c) and not passable(r - 1, c - dc))
+					or (passable(r + 1, c) and not passable(r + 1, c - dc))):
+				return (r, c)
+		else:
+			if ((passable(r, c - 1) and not passable(r - dr, c - 1))
+					or (passable(r, c + 1) and not passable(r - dr, c + 1))):
+				return (r, c)
+		r += dr
+		c += dc
+	return None
+
+def _jump(grid, node, direction, end):
+	# next jump point from node in direction, None if the run is a dead end
+	dr, dc = direction
+	r, c = node[0] + dr, node[1] + dc
+	if not dr or not dc:
+		return _jump_straight(grid, r, c, dr, dc, end)
+	passable = grid.passable
+	while passable(r, c):
+		if (r, c) == end:
+			return (r, c)
+		# a diagonal cell is a jump point when a straight run from it finds one
+		if (_jump_straight(grid, r + dr, c, dr, 0, end) is not None
+				or _jump_straight(grid, r, c + dc, 0, dc, end) is not None):
+			return (r, c)
+		if not (passable(r + dr, c) and passable(r, c + dc)):
+			return None
+		r += dr
+		c += dc
+	return None
+
+def _interpolate(parent, end):
+	# fills in the cells between consecutive jump points
+	jump_points = []
+	node = end
+	while node is not None:
+		jump_points.append(node)
+		node = parent[node]
+	jump_points.reverse()
+	path = [jump_points[0]]
+	for r, c in jump_points[1:]:
+		pr, pc = path[-1]
+		dr, dc = _sign(r - pr), _sign(c - pc)
+		while (pr, pc) != (r, c):
+			pr, pc = pr + dr, pc + dc
+			path.append((pr, pc))
+	return path
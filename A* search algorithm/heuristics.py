@@ -0,0 +1,153 @@
+import math
+from abc import ABC, abstractmethod
+
+EARTH_RADIUS_KM = 6371.0088
+
+class Heuristic(ABC):
+	"""
+	Estimated cost from a node to a goal
+
+	A provider answers `node in heuristic` (is an estimate available for this
+	node) and `heuristic(node, goal)` (the estimate). a_star_search skips
+	nodes without an estimate, the same way it skips nodes missing from a
+	dis_map. Subclasses must define __call__.
+	"""
+	def __contains__(self, node):
+		return True
+
+	@abstractmethod
+	def __call__(self, node, goal):
+		pass
+
+	def reversed(self):
+		"""
+		Provider of estimates on the reversed edges, where reversed()(node, goal)
+		bounds the cost from goal to node; searches keep one provider per
+		direction so that each sees a fixed goal. The default assumes the
+		estimate is symmetric.
+
+		Returns:
+		Heuristic
+		"""
+		return self
+
+class DisMapHeuristic(Heuristic):
+	"""Adapter for a precomputed dis_map[node][goal] table"""
+	def __init__(self, dis_map):
+		self.dis_map = dis_map
+
+	def __contains__(self, node):
+		return node in self.dis_map
+
+	def __call__(self, node, goal):
+		return self.dis_map[node][goal]
+
+class EuclideanHeuristic(Heuristic):
+	"""
+	Straight-line distance between planar (x, y) coordinates
+
+	scale converts distance to cost, it must not exceed the lowest cost per
+	unit distance of any edge for the estimate to be admissible.
+	"""
+	def __init__(self, coords, scale=1):
+		self.coords = coords
+		self.scale = scale
+
+	def __contains__(self, node):
+		return node in self.coords
+
+	def __call__(self, node, goal):
+		x1, y1 = self.coords[node]
+		x2, y2 = self.coords[goal]
+		return self.scale * math.hypot(x2 - x1, y2 - y1)
+
+class HaversineHeuristic(Heuristic):
+	"""
+	Great-circle distance in kilometers between (latitude, longitude) degrees
+
+	scale converts kilometers to cost, e.g. 1 / top speed for travel times.
+	"""
+	def __init__(self, coords, scale=1):
+		self.coords = coords
+		self.scale = scale
+
+	def __contains__(self, node):
+		return node in self.coords
+
+	def __call__(self, node, goal):
+		lat1, lon1 = self.coords[node]
+		lat2, lon2 = self.coords[goal]
+		phi1 = math.radians(lat1)
+		phi2 = math.radians(lat2)
+		a = (math.sin((phi2 - phi1) / 2) ** 2
+			+ math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+		return self.scale * 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class MemoizedHeuristic(Heuristic):
+	"""
+	Lazily computed heuristic cached for the current goal
+
+	Values of estimate(node, goal) are computed on first use and kept until a
+	different goal is asked for, so memory stays linear in the nodes touched
+	by one search. nodes optionally restricts which nodes have an estimate.
+	"""
+	def __init__(self, estimate, nodes=None):
+		self.estimate = estimate
+		self.nodes = nodes
+		self.goal = None
+		self.cache = {}
+
+	def __contains__(self, node):
+		return self.nodes is None or node in self.nodes
+
+	def __call__(self, node, goal):
+		if goal != self.goal:
+			self.goal = goal
+			self.cache = {}
+		if node in self.cache:
+			return self.cache[node]
+		value = self.cache[node] = self.estimate(node, goal)
+		return value
+
+	def reversed(self):
+		# same estimate with a cache of its own
+		if getattr(self, '_reversed', None) is None:
+			self._reversed = MemoizedHeuristic(self.estimate, self.nodes)
+			self._reversed._reversed = self
+		return self._reversed
+
+class WeightedHeuristic(Heuristic):
+	"""
+	Heuristic inflated by a weight w >= 1 for weighted A* (f = g + w * h)
+
+	With an admissible base heuristic the paths found cost at most w times
+	the optimal cost.
+	"""
+	def __init__(self, heuristic, weight):
+		self.heuristic = heuristic
+		self.weight = weight
+
+	def __contains__(self, node):
+		return node in self.heuristic
+
+	def __call__(self, node, goal):
+		return self.weight * self.heuristic(node, goal)
+
+	def reversed(self):
+		return WeightedHeuristic(self.heuristic.reversed(), self.weight)
+
+def as_heuristic(heuristic):
+	"""
+	Wraps a dis_map dict or a plain function as a Heuristic
+
+	Parameters:
+	heuristic (Heuristic|Dict|Callable): heuristic provider, dis_map[node][goal] table or estimate(node, goal)
+
+	Returns:
+	Heuristic
+	"""
+	if isinstance(heuristic, Heuristic):
+		return heuristic
+	if isinstance(heuristic, dict):
+		return DisMapHeuristic(heuristic)
+	return MemoizedHeuristic(heuristic)
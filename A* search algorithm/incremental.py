@@ -0,0 +1,118 @@
+from expand import expand
+from graph import reverse_map
+from heuristics import as_heuristic
+from priority_queue import IndexedMinHeap
+
+INF = float('inf')
+
+class LifelongPlanner:
+	"""
+	Lifelong Planning A* (LPA*) between a fixed start and end
+
+	The planner keeps g costs and one-step lookahead costs (rhs) between
+	calls. After update_edge only the nodes whose costs are affected become
+	inconsistent and are expanded again by the next search. Results are
+	optimal when the heuristic is consistent: a path costs the same as the
+	one a_star_search finds, but among paths of equal cost the planner may
+	pick a different one.
+
+	Attributes:
+		time_map (Dict): travel times, edge updates are applied to it
+		predecessors (Dict): predecessors[v][u], cost of edge u -> v
+		g (Dict): cost of the best path found to each node
+		rhs (Dict): lookahead cost of each node from its predecessors' g
+	"""
+	def __init__(self, dis_map, time_map, start, end):
+		self.heuristic = as_heuristic(dis_map)
+		self.time_map = time_map
+		self.start = start
+		self.end = end
+		self.predecessors = reverse_map(time_map)
+		self.g = {}
+		self.rhs = {start: 0}
+		self.open_nodes = IndexedMinHeap()
+		if self.valid():
+			self.open_nodes.push(start, self.key(start))
+
+	def valid(self):
+		# like a_star_search, both ends need a heuristic cost
+		return self.start in self.heuristic and self.end in self.heuristic
+
+	def key(self, node):
+		# (f, g) with g = min(g, rhs), ties broken on smaller g then name
+		cost = min(self.g.get(node, INF), self.rhs.get(node, INF))
+		return (cost + self.heuristic(node, self.end), cost)
+
+	def update_node(self, node):
+		if node != self.start:
+			best = INF
+			for prev, time in self.predecessors.get(node, {}).items():
+				if prev in self.g and self.g[prev] + time < best:
+					best = self.g[prev] + time
+			self.rhs[node] = best
+		if node in self.open_nodes:
+			self.open_nodes.remove(node)
+		if self.g.get(node, INF) != self.rhs.get(node, INF):
+			self.open_nodes.push(node, self.key(node))
+
+	def compute_shortest_path(self):
+		end = self.end
+		while len(self.open_nodes) > 0 and (self.open_nodes.peek()[0] < self.key(end)
+				or self.rhs.get(end, INF) != self.g.get(end, INF)):
+			node = self.open_nodes.pop()[1]
+			if self.g.get(node, INF) > self.rhs[node]:
+				# overconsistent, the node's cost has dropped
+				self.g[node] = self.rhs[node]
+			else:
+				# underconsistent, the node's cost has risen
+				self.g.pop(node, None)
+				self.update_node(node)
+			if node in self.time_map:
+				for next_node in expand(node, self.time_map):
+					if next_node in self.heuristic:
+						self.update_node(next_node)
+
+	def search(self):
+		"""
+		Repairs the search after edge updates and returns the current best path
+
+		Expansions are counted in expand.expand_count like a_star_search.
+
+		Returns:
+		List: nodes from start to end, empty if there is no path
+		"""
+		if not self.valid():
+			return []
+		self.compute_shortest_path()
+		if self.g.get(self.end, INF) == INF:
+			return []
+		# walk back through the predecessor that gives each node its g cost,
+		# ties go to the smaller name rather than to the first one found
+		path = [self.end]
+		node = self.end
+		while node != self.start:
+			node = min((self.g[prev] + time, prev) for prev, time in self.predecessors[node].items()
+				if prev in self.g)[1]
+			path.append(node)
+		path.reverse()
+		return path
+
+	def update_edge(self, node, next_node, time):
+		"""
+		Changes the travel time of an edge in time_map
+
+		Parameters:
+		node (Hashable): tail of the edge
+		next_node (Hashable): head of the edge
+		time (Number): new travel time, None removes the edge
+
+		Returns:
+		None
+		"""
+		self.time_map.setdefault(node, {})[next_node] = time
+		if time is None:
+			self.predecessors.get(next_node, {}).pop(node, None)
+		else:
+			self.predecessors.setdefault(next_node, {})[node] = time
+		if next_node in self.heuristic:
+			self.update_node(next_node)
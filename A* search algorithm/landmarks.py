@@ -0,0 +1,142 @@
+import pickle
+from array import array
+
+from code import dijkstra
+from graph import reverse_map
+from heuristics import Heuristic
+
+INF = float('inf')
+
+def select_landmarks(time_map, k, first=None):
+	"""
+	Picks k landmarks by farthest-point selection
+
+	Each new landmark is the reachable node farthest from the landmarks
+	chosen so far, which spreads them towards the borders of the map.
+
+	Parameters:
+	time_map (Dict): travel times
+	k (Int): number of landmarks
+	first (Hashable): node to start the selection from, defaults to the smallest name
+
+	Returns:
+	List: landmark nodes
+	"""
+	if first is None:
+		first = min(time_map)
+	# the first landmark is the node farthest from the starting node
+	dist, _ = dijkstra(time_map, first)
+	closest = dict(dist)
+	landmarks = []
+	while len(landmarks) < k:
+		candidates = [node for node in closest if node not in landmarks]
+		if not candidates:
+			break
+		landmark = max(candidates, key=lambda node: (closest[node], node))
+		landmarks.append(landmark)
+		dist, _ = dijkstra(time_map, landmark)
+		for node in closest:
+			closest[node] = min(closest[node], dist.get(node, INF))
+	return landmarks
+
+class LandmarkHeuristic(Heuristic):
+	"""
+	ALT heuristic from landmark distances and the triangle inequality
+
+	For every landmark L, d(L, goal) - d(L, node) and d(node, L) - d(goal, L)
+	are lower bounds of d(node, goal), so their maximum over all landmarks
+	is admissible (and consistent) on the map it was built from.
+
+	Attributes:
+		names (List): node names, index i of every table refers to names[i]
+		landmarks (List): landmark nodes
+		from_landmark (List of array): d(L, node) per landmark, inf if unreachable
+		to_landmark (List of array): d(node, L) per landmark, inf if unreachable
+	"""
+	def __init__(self, names, landmarks, from_landmark, to_landmark):
+		self.names = names
+		self.index = {name: i for i, name in enumerate(names)}
+		self.landmarks = landmarks
+		self.from_landmark = from_landmark
+		self.to_landmark = to_landmark
+		self.goal = None
+		self.goal_bounds = None
+
+	@classmethod
+	def build(cls, time_map, k=8, landmarks=None):
+		"""
+		Runs Dijkstra forward and backward from every landmark
+
+		Parameters:
+		time_map (Dict): travel times
+		k (Int): number of landmarks to select when landmarks is None
+		landmarks (List): landmark nodes to use instead of selecting them
+
+		Returns:
+		LandmarkHeuristic
+		"""
+		if landmarks is None:
+			landmarks = select_landmarks(time_map, k)
+		reversed_map = reverse_map(time_map)
+		names = sorted(reversed_map)
+		from_landmark = []
+		to_landmark = []
+		for landmark in landmarks:
+			for graph, tables in ((time_map, from_landmark), (reversed_map, to_landmark)):
+				dist, _ = dijkstra(graph, landmark)
+				tables.append(array('d', (dist.get(name, INF) for name in names)))
+		return cls(names, landmarks, from_landmark, to_landmark)
+
+	def save(self, path):
+		with open(path, 'wb') as f:
+			pickle.dump((self.names, self.landmarks,
+				[table.tobytes() for table in self.from_landmark],
+				[table.tobytes() for table in self.to_landmark]), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+	@classmethod
+	def load(cls, path):
+		"""
+		Loads tables written by save, only load files from trusted sources
+
+		Parameters:
+		path (String): path of the saved tables
+
+		Returns:
+		LandmarkHeuristic
+		"""
+		with open(path, 'rb') as f:
+			names, landmarks, from_landmark, to_landmark = pickle.load(f)
+		def to_array(data):
+			table = array('d')
+			table.frombytes(data)
+			return table
+		return cls(names, landmarks, [to_array(data) for data in from_landmark], [to_array(data) for data in to_landmark])
+
+	def reversed(self):
+		# swapping the tables gives the bounds of the reversed map
+		if getattr(self, '_reversed', None) is None:
+			self._reversed = LandmarkHeuristic(self.names, self.landmarks, self.to_landmark, self.from_landmark)
+			self._reversed._reversed = self
+		return self._reversed
+
+	def __contains__(self, node):
+		return node in self.index
+
+	def __call__(self, node, goal):
+		if goal != self.goal:
+			# distances of the goal are the same for every node of a query
+			g = self.index[goal]
+			self.goal = goal
+			self.goal_bounds = [(table[g], to_table[g], table, to_table)
+				for table, to_table in zip(self.from_landmark, self.to_landmark)]
+		i = self.index[node]
+		best = 0
+		for from_goal, to_goal, table, to_table in self.goal_bounds:
+			# comparisons with nan (inf - inf) are false, so those landmarks are skipped
+			bound = from_goal - table[i]
+			if bound > best:
+				best = bound
+			bound = to_table[i] - to_goal
+			if bound > best:
+				best = bound
+		return best
@@ -1,6 +1,26 @@
 import unittest
 import code as sc
 import expand
+from priority_queue import IndexedMinHeap
+from graph import CSRGraph, MappedGraph, reverse_map, save_graph
+from heuristics import Heuristic, DisMapHeuristic, EuclideanHeuristic, HaversineHeuristic, MemoizedHeuristic
+from landmarks import LandmarkHeuristic
+from contraction import ContractionHierarchy
+from batch import route_matrix
+from incremental import LifelongPlanner
+from route_cache import RouteCache
+from search_stats import SearchStats
+import benchmark
+from anytime import anytime_a_star_search
+from grid import OccupancyGrid, jump_point_search, octile
+from server import RouteServer
+import asyncio
+import json
+import time
+import copy
+import random
+import os
+import tempfile
 
 dis_map = {
     'Campus': {'Campus': 0, 'Whole_Food': 3, 'Beach': 5, 'Cinema': 5, 'Lighthouse': 1, 'Ryan_Field': 2, 'YWCA': 12},
@@ -102,6 +122,21 @@ time_map_tie_breaking_test = {
     'YWCA': {'Campus': None, 'Whole_Food': None, 'Beach': None, 'Cinema': 13, 'Lighthouse': None, 'Ryan_Field': 15, 'YWCA': None, 'CVS': None},
     'CVS': {'Campus': 7, 'Whole_Food': None, 'Beach': None, 'Cinema': 6, 'Lighthouse': None, 'Ryan_Field': None, 'YWCA': None, 'CVS': None}}
 
+def random_time_map(side, seed=0):
+    # directed side x side grid with different travel times in each direction
+    rng = random.Random(seed)
+    t_map = {(r, c): {} for r in range(side) for c in range(side)}
+    for r, c in t_map:
+        for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+            if (r + dr, c + dc) in t_map and rng.random() < 0.9:
+                t_map[(r, c)][(r + dr, c + dc)] = rng.randint(1, 9)
+    return t_map
+
+def path_cost(t_map, path):
+    return sum(t_map[path[i]][path[i + 1]] for i in range(len(path) - 1))
+
+zero_heuristic = lambda node, goal: 0
+
 class SearchTest(unittest.TestCase):
 
     def test1(self):
@@ -184,5 +219,632 @@ class SearchTest(unittest.TestCase):
         self.assertEqual(path, ['Campus', 'Beach', 'Whole_Food', 'CVS', 'Cinema'])
         self.assertEqual(expand.expand_count, 6)
 
+    def test14(self):
+        # long route, every node on the chain is expanded once
+        n = 5000
+        chain_time_map = {i: {i + 1: 1} for i in range(n - 1)}
+        chain_time_map[n - 1] = {}
+        chain_dis_map = {i: {n - 1: n - 1 - i} for i in range(n)}
+        expand.expand_count = 0
+        path = sc.a_star_search(chain_dis_map, chain_time_map, 0, n - 1)
+        self.assertEqual(path, list(range(n)))
+        self.assertEqual(expand.expand_count, n - 1)
+
+search_cases = [
+    (dis_map, time_map1, 'Campus', 'Cinema'),
+    (dis_map, time_map2, 'Campus', 'Cinema'),
+    (dis_map, time_map3, 'Campus', 'Cinema'),
+    (dis_map, time_map4, 'Campus', 'Cinema'),
+    (dis_map, time_map1, 'Ryan_Field', 'Beach'),
+    (dis_map, time_map1, 'Campus', 'Campus'),
+    (dis_map, time_map1, 'Campus', 'Waldalgesheim'),
+    (dis_map, time_map1, 'Frankfurt', 'Cinema'),
+    (dis_map, time_map5, 'Campus', 'YWCA'),
+    (dis_map, time_map6, 'Campus', 'Ryan_Field'),
+    (dis_map, time_map7, 'Campus', 'Cinema'),
+    (dis_map, time_map8, 'Campus', 'Cinema'),
+    (dis_map_tie_breaking_test, time_map_tie_breaking_test, 'Campus', 'Cinema')]
+
+class CSRGraphTest(unittest.TestCase):
+
+    def test_from_map(self):
+        graph = CSRGraph.from_map(time_map1)
+        self.assertEqual(graph.names, sorted(time_map1))
+        self.assertEqual(graph.edge_count(), 16)
+        campus = graph.id_of('Campus')
+        self.assertEqual(sorted((graph.name_of(t), w) for t, w in graph.neighbors(campus)),
+                         [('Beach', 13), ('Lighthouse', 11), ('Whole_Food', 14)])
+        self.assertIsNone(graph.id_of('Waldalgesheim'))
+
+    def test_same_as_dict_search(self):
+        for case in search_cases:
+            expand.expand_count = 0
+            path = sc.a_star_search(*case)
+            count = expand.expand_count
+            d_map, t_map, start, end = case
+            expand.expand_count = 0
+            self.assertEqual(sc.a_star_search_csr(d_map, CSRGraph.from_map(t_map), start, end), path)
+            self.assertEqual(expand.expand_count, count)
+
+    def test_from_edge_list(self):
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write('# source target time\n')
+            for node in time_map1:
+                for next_node, t in time_map1[node].items():
+                    if t is not None:
+                        f.write('{} {} {}\n'.format(node, next_node, t))
+        try:
+            graph = CSRGraph.from_edge_list(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(sc.a_star_search_csr(dis_map, graph, 'Campus', 'Cinema'),
+                         ['Campus', 'Whole_Food', 'Cinema'])
+
+class MappedGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.graph')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_same_as_csr(self):
+        save_graph(time_map_tie_breaking_test, self.path)
+        graph = CSRGraph.from_map(time_map_tie_breaking_test)
+        with MappedGraph(self.path) as mapped:
+            self.assertEqual(len(mapped), len(graph))
+            self.assertEqual([mapped.names[i] for i in range(len(mapped))], graph.names)
+            for name in graph.names:
+                node = mapped.id_of(name)
+                self.assertEqual(node, graph.id_of(name))
+                self.assertEqual(list(mapped.neighbors(node)), list(graph.neighbors(node)))
+            self.assertIsNone(mapped.id_of('Waldalgesheim'))
+            self.assertEqual(sc.a_star_search_csr(dis_map_tie_breaking_test, mapped, 'Campus', 'Cinema'),
+                             ['Campus', 'Beach', 'Whole_Food', 'CVS', 'Cinema'])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            save_graph({(0, 0): {(0, 1): 1}}, self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 64)
+        with self.assertRaises(ValueError):
+            MappedGraph(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'CSRG')
+        with self.assertRaises(ValueError):
+            MappedGraph(self.path)
+
+    def test_truncated(self):
+        save_graph(time_map_tie_breaking_test, self.path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(data[:len(data) - 3])
+        with self.assertRaisesRegex(ValueError, 'truncated'):
+            MappedGraph(self.path)
+
+class HeuristicTest(unittest.TestCase):
+
+    def test_dis_map_adapter(self):
+        for case in search_cases:
+            d_map, t_map, start, end = case
+            self.assertEqual(sc.a_star_search(DisMapHeuristic(d_map), t_map, start, end),
+                             sc.a_star_search(*case))
+
+    def test_coordinates(self):
+        euclidean = EuclideanHeuristic({'a': (0, 0), 'b': (3, 4)}, scale=2)
+        self.assertAlmostEqual(euclidean('a', 'b'), 10)
+        self.assertNotIn('c', euclidean)
+        # Chicago to Evanston is about 19 km
+        haversine = HaversineHeuristic({'Chicago': (41.8781, -87.6298), 'Evanston': (42.0451, -87.6877)})
+        self.assertAlmostEqual(haversine('Chicago', 'Evanston'), 19.2, delta=0.2)
+
+    def test_memoized(self):
+        calls = []
+        def estimate(node, goal):
+            calls.append(node)
+            return abs(node - goal)
+        heuristic = MemoizedHeuristic(estimate)
+        self.assertEqual(heuristic(3, 10), 7)
+        self.assertEqual(heuristic(3, 10), 7)
+        self.assertEqual(calls, [3])
+        self.assertEqual(heuristic(3, 5), 2)
+        self.assertEqual(calls, [3, 3])
+
+    def test_needs_call(self):
+        class NoEstimate(Heuristic):
+            def __contains__(self, node):
+                return True
+        self.assertRaises(TypeError, NoEstimate)
+
+    def test_search_with_coordinates(self):
+        coords = {'a': (0, 0), 'b': (1, 1), 'c': (1, -1), 'd': (2, 0)}
+        t_map = {'a': {'b': 1.5, 'c': 1.45}, 'b': {'d': 1.6}, 'c': {'d': 1.5}, 'd': {}}
+        heuristic = EuclideanHeuristic(coords)
+        self.assertEqual(sc.a_star_search(heuristic, t_map, 'a', 'd'), ['a', 'c', 'd'])
+        self.assertEqual(sc.a_star_search_csr(heuristic, CSRGraph.from_map(t_map), 'a', 'd'), ['a', 'c', 'd'])
+
+class LandmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.t_map = random_time_map(12)
+        self.alt = LandmarkHeuristic.build(self.t_map, k=4)
+
+    def test_admissible(self):
+        for goal in [(0, 0), (5, 7), (11, 11)]:
+            dist, _ = sc.dijkstra(reverse_map(self.t_map), goal)
+            for node in self.t_map:
+                self.assertLessEqual(self.alt(node, goal), dist.get(node, float('inf')))
+
+    def test_fewer_expansions(self):
+        rng = random.Random(1)
+        nodes = sorted(self.t_map)
+        for _ in range(10):
+            start, end = rng.choice(nodes), rng.choice(nodes)
+            expand.expand_count = 0
+            plain = sc.a_star_search(zero_heuristic, self.t_map, start, end)
+            plain_count = expand.expand_count
+            expand.expand_count = 0
+            path = sc.a_star_search(self.alt, self.t_map, start, end)
+            self.assertLessEqual(expand.expand_count, plain_count)
+            self.assertEqual(path_cost(self.t_map, path), path_cost(self.t_map, plain))
+
+    def test_save_load(self):
+        fd, path = tempfile.mkstemp(suffix='.alt')
+        os.close(fd)
+        try:
+            self.alt.save(path)
+            loaded = LandmarkHeuristic.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.landmarks, self.alt.landmarks)
+        for node in [(0, 0), (3, 4), (11, 2)]:
+            self.assertEqual(loaded(node, (6, 6)), self.alt(node, (6, 6)))
+
+class BidirectionalTest(unittest.TestCase):
+
+    def test_same_as_search(self):
+        for case in search_cases:
+            self.assertEqual(sc.bidirectional_a_star_search(*case), sc.a_star_search(*case))
+
+    def test_optimal(self):
+        t_map = random_time_map(20, seed=3)
+        reversed_map = reverse_map(t_map)
+        rng = random.Random(2)
+        nodes = sorted(t_map)
+        one_way = two_way = 0
+        for _ in range(30):
+            start, end = rng.choice(nodes), rng.choice(nodes)
+            dist, _ = sc.dijkstra(t_map, start)
+            expand.expand_count = 0
+            sc.a_star_search(zero_heuristic, t_map, start, end)
+            one_way += expand.expand_count
+            expand.expand_count = 0
+            path = sc.bidirectional_a_star_search(zero_heuristic, t_map, start, end, reversed_map)
+            two_way += expand.expand_count
+            if end in dist:
+                self.assertEqual((path[0], path[-1]), (start, end))
+                self.assertEqual(path_cost(t_map, path), dist[end])
+            else:
+                self.assertEqual(path, [])
+        self.assertLess(two_way, one_way)
+
+    def test_reverse_heuristic(self):
+        # each direction has its own provider whose goal stays fixed
+        t_map = random_time_map(12, seed=5)
+        alt = LandmarkHeuristic.build(t_map, k=4)
+        reversed_map = reverse_map(t_map)
+        nodes = sorted(t_map)
+        rng = random.Random(6)
+        for _ in range(20):
+            start, end = rng.choice(nodes), rng.choice(nodes)
+            dist, _ = sc.dijkstra(t_map, start)
+            path = sc.bidirectional_a_star_search(alt, t_map, start, end, reversed_map)
+            self.assertEqual(path_cost(t_map, path) if path else None, dist.get(end))
+            if start != end:
+                self.assertEqual((alt.goal, alt.reversed().goal), (end, start))
+        calls = []
+        def estimate(node, goal):
+            calls.append(goal)
+            return 0
+        h = MemoizedHeuristic(estimate)
+        sc.bidirectional_a_star_search(h, t_map, nodes[0], nodes[-1], reversed_map)
+        # every node is estimated at most once per direction
+        self.assertLessEqual(len(calls), 2 * len(t_map))
+
+class ContractionHierarchyTest(unittest.TestCase):
+
+    def test_same_cost_as_search(self):
+        for case in search_cases:
+            d_map, t_map, start, end = case
+            path = ContractionHierarchy.build(t_map).search(start, end)
+            expected = sc.a_star_search(*case)
+            self.assertEqual(path[:1] + path[-1:], expected[:1] + expected[-1:])
+            self.assertEqual(path_cost(t_map, path), path_cost(t_map, expected))
+
+    def test_optimal(self):
+        t_map = random_time_map(15, seed=5)
+        hierarchy = ContractionHierarchy.build(t_map)
+        self.assertTrue(hierarchy.middle)
+        rng = random.Random(1)
+        nodes = sorted(t_map)
+        for _ in range(50):
+            start, end = rng.choice(nodes), rng.choice(nodes)
+            dist, _ = sc.dijkstra(t_map, start)
+            path = hierarchy.search(start, end)
+            if end in dist:
+                self.assertEqual((path[0], path[-1]), (start, end))
+                self.assertEqual(path_cost(t_map, path), dist[end])
+            else:
+                self.assertEqual(path, [])
+
+    def test_save_load(self):
+        hierarchy = ContractionHierarchy.build(time_map2)
+        fd, path = tempfile.mkstemp(suffix='.ch')
+        os.close(fd)
+        try:
+            hierarchy.save(path)
+            loaded = ContractionHierarchy.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.rank, hierarchy.rank)
+        self.assertEqual(loaded.search('Campus', 'Cinema'), ['Campus', 'Beach', 'Whole_Food', 'Cinema'])
+
+class RouteMatrixTest(unittest.TestCase):
+
+    def test_matrix(self):
+        t_map = random_time_map(8, seed=7)
+        nodes = sorted(t_map)
+        sources = nodes[:10] + nodes[:2]
+        targets = nodes[-10:]
+        matrix, paths = route_matrix(t_map, sources, targets, processes=1, paths=True)
+        self.assertEqual(len(matrix), len(sources))
+        for i, source in enumerate(sources):
+            dist, _ = sc.dijkstra(t_map, source)
+            for j, target in enumerate(targets):
+                self.assertEqual(matrix[i][j], dist.get(target, float('inf')))
+                if target in dist:
+                    self.assertEqual(path_cost(t_map, paths[i][j]), dist[target])
+
+    def test_process_pool(self):
+        t_map = random_time_map(8, seed=7)
+        nodes = sorted(t_map)
+        expected, _ = route_matrix(t_map, nodes[:6], nodes, processes=1)
+        matrix, paths = route_matrix(t_map, nodes[:6], nodes, processes=2)
+        self.assertEqual(matrix, expected)
+        self.assertIsNone(paths)
+
+    def test_unreachable(self):
+        matrix, paths = route_matrix(time_map5, ['Campus'], ['YWCA', 'Campus'], processes=1, paths=True)
+        self.assertEqual(matrix, [[float('inf'), 0]])
+        self.assertEqual(paths, [[[], ['Campus']]])
+
+class LifelongPlannerTest(unittest.TestCase):
+
+    def test_same_cost_as_search(self):
+        for case in search_cases:
+            d_map, t_map, start, end = case
+            path = LifelongPlanner(d_map, copy.deepcopy(t_map), start, end).search()
+            expected = sc.a_star_search(*case)
+            self.assertEqual(path[:1] + path[-1:], expected[:1] + expected[-1:])
+            self.assertEqual(path_cost(t_map, path), path_cost(t_map, expected))
+
+    def test_edge_updates(self):
+        t_map = random_time_map(12, seed=4)
+        rng = random.Random(3)
+        nodes = sorted(t_map)
+        planner = LifelongPlanner(zero_heuristic, t_map, (0, 0), (11, 11))
+        planner.search()
+        repaired = fresh = 0
+        for _ in range(30):
+            node = rng.choice(nodes)
+            next_node = rng.choice(sorted(t_map[node]))
+            planner.update_edge(node, next_node, rng.choice([None, 1, 5, 20]))
+            expand.expand_count = 0
+            path = planner.search()
+            repaired += expand.expand_count
+            expand.expand_count = 0
+            expected = sc.a_star_search(zero_heuristic, t_map, (0, 0), (11, 11))
+            fresh += expand.expand_count
+            if expected:
+                self.assertEqual((path[0], path[-1]), ((0, 0), (11, 11)))
+                self.assertEqual(path_cost(t_map, path), path_cost(t_map, expected))
+            else:
+                self.assertEqual(path, [])
+        self.assertLess(repaired, fresh)
+
+    def test_blocked(self):
+        t_map = copy.deepcopy(time_map1)
+        planner = LifelongPlanner(dis_map, t_map, 'Campus', 'Cinema')
+        self.assertEqual(planner.search(), ['Campus', 'Whole_Food', 'Cinema'])
+        planner.update_edge('Whole_Food', 'Cinema', None)
+        self.assertEqual(planner.search(), ['Campus', 'Lighthouse', 'Ryan_Field', 'YWCA', 'Cinema'])
+        planner.update_edge('Whole_Food', 'Cinema', 13)
+        self.assertEqual(planner.search(), ['Campus', 'Whole_Food', 'Cinema'])
+
+class RouteCacheTest(unittest.TestCase):
+
+    def test_hits_and_subpaths(self):
+        cache = RouteCache(dis_map, copy.deepcopy(time_map4))
+        path = ['Campus', 'Lighthouse', 'Ryan_Field', 'YWCA', 'Cinema']
+        self.assertEqual(cache.route('Campus', 'Cinema'), path)
+        self.assertEqual(cache.route('Campus', 'Cinema'), path)
+        expand.expand_count = 0
+        self.assertEqual(cache.route('Lighthouse', 'YWCA'), path[1:4])
+        self.assertEqual(expand.expand_count, 0)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['subpath_hits'], stats['misses']), (1, 1, 1))
+
+    def test_lru_and_ttl(self):
+        now = [0]
+        cache = RouteCache(dis_map, time_map1, max_size=2, ttl=10, clock=lambda: now[0])
+        cache.route('Campus', 'Cinema')
+        cache.route('Beach', 'Campus')
+        cache.route('Campus', 'Cinema')
+        cache.route('Ryan_Field', 'Lighthouse')
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertIn(('Campus', 'Cinema', 0), cache.entries)
+        now[0] = 10
+        cache.route('Campus', 'Cinema')
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_update_edge(self):
+        cache = RouteCache(dis_map, copy.deepcopy(time_map1))
+        cache.route('Campus', 'Cinema')
+        cache.route('Ryan_Field', 'Beach')
+        # slower edge on the first route only
+        cache.update_edge('Whole_Food', 'Cinema', 40)
+        self.assertEqual(cache.version, 1)
+        self.assertEqual(list(cache.entries), [('Ryan_Field', 'Beach', 1)])
+        self.assertEqual(cache.route('Campus', 'Cinema'), ['Campus', 'Lighthouse', 'Ryan_Field', 'YWCA', 'Cinema'])
+        # a faster edge can improve any route
+        cache.update_edge('Whole_Food', 'Cinema', 13)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.route('Campus', 'Cinema'), ['Campus', 'Whole_Food', 'Cinema'])
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_counters(self):
+        expand.expand_count = 0
+        path, stats = sc.a_star_search_with_stats(dis_map, time_map2, 'Campus', 'Cinema')
+        self.assertEqual(path, ['Campus', 'Beach', 'Whole_Food', 'Cinema'])
+        self.assertEqual(stats.expanded, expand.expand_count)
+        self.assertEqual(stats.pushed, 7)
+        self.assertGreaterEqual(stats.popped, stats.expanded)
+        self.assertGreaterEqual(stats.peak_open, 1)
+        self.assertEqual(stats.heap_operations, stats.pushed + stats.popped + stats.decrease_keys)
+        self.assertGreaterEqual(stats.wall_time, 0)
+
+    def test_csr_matches(self):
+        for case in search_cases:
+            d_map, t_map, start, end = case
+            _, stats = sc.a_star_search_with_stats(*case)
+            csr_stats = SearchStats()
+            sc.a_star_search_csr(d_map, CSRGraph.from_map(t_map), start, end, stats=csr_stats)
+            self.assertEqual(csr_stats.expanded, stats.expanded)
+            self.assertEqual(csr_stats.decrease_keys, stats.decrease_keys)
+
+    def test_reuse(self):
+        _, expected = sc.a_star_search_with_stats(dis_map, time_map2, 'Campus', 'Cinema')
+        stats = SearchStats()
+        sc.a_star_search(dis_map, time_map1, 'Campus', 'YWCA', stats=stats)
+        sc.a_star_search(dis_map, time_map2, 'Campus', 'Cinema', stats=stats)
+        for key in ('expanded', 'pushed', 'popped', 'decrease_keys', 'peak_open', 'heap_operations'):
+            self.assertEqual(getattr(stats, key), getattr(expected, key))
+
+    def test_callback(self):
+        samples = []
+        t_map = random_time_map(10)
+        _, stats = sc.a_star_search_with_stats(zero_heuristic, t_map, (0, 0), (9, 9),
+                                               callback=lambda expanded, size: samples.append((expanded, size)),
+                                               sample_every=5)
+        self.assertEqual([expanded for expanded, _ in samples], list(range(5, stats.expanded + 1, 5)))
+        self.assertTrue(all(size <= stats.peak_open for _, size in samples))
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_run_and_compare(self):
+        results = benchmark.run(['road', 'grid'], [100], ['astar', 'csr'], 2, 0)
+        self.assertEqual(len(results), 4)
+        by_engine = {(r['workload'], r['engine']): r for r in results}
+        for workload in ('road', 'grid'):
+            self.assertEqual(by_engine[(workload, 'astar')]['expanded'], by_engine[(workload, 'csr')]['expanded'])
+        self.assertEqual(benchmark.regressions(results, results, 0.2), [])
+        baseline = [dict(r, expanded=r['expanded'] - 1) for r in results]
+        self.assertEqual(len(benchmark.regressions(results, baseline, 0.2)), 4)
+
+class AnytimeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.t_map = benchmark.obstacle_grid_map(40, seed=2)
+        rng = random.Random(0)
+        nodes = sorted(self.t_map)
+        self.pairs = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(10)]
+
+    def test_weighted(self):
+        for start, end in self.pairs:
+            dist, _ = sc.dijkstra(self.t_map, start)
+            path = sc.weighted_a_star_search(benchmark.octile, self.t_map, start, end, weight=2)
+            if end in dist:
+                self.assertLessEqual(path_cost(self.t_map, path), 2 * dist[end] + 1e-9)
+            else:
+                self.assertEqual(path, [])
+
+    def test_anytime(self):
+        for start, end in self.pairs:
+            dist, _ = sc.dijkstra(self.t_map, start)
+            solutions = []
+            path, cost, bound = anytime_a_star_search(benchmark.octile, self.t_map, start, end, 10,
+                                                      callback=lambda *solution: solutions.append(solution))
+            if end not in dist:
+                self.assertEqual((path, cost, bound), ([], float('inf'), float('inf')))
+                continue
+            self.assertAlmostEqual(cost, dist[end])
+            self.assertAlmostEqual(path_cost(self.t_map, path), cost)
+            self.assertEqual(bound, 1)
+            for _, solution_cost, solution_bound in solutions:
+                self.assertLessEqual(solution_cost, solution_bound * dist[end] + 1e-9)
+
+    def test_deadline(self):
+        t_map = benchmark.obstacle_grid_map(150, seed=2)
+        started = time.perf_counter()
+        path, cost, bound = anytime_a_star_search(benchmark.octile, t_map, min(t_map), max(t_map), 0.05, weight=5)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(anytime_a_star_search(dis_map, time_map1, 'Campus', 'Cinema', 0), ([], float('inf'), float('inf')))
+
+class JumpPointSearchTest(unittest.TestCase):
+
+    def test_grid(self):
+        grid = OccupancyGrid.from_strings(['..#',
+                                           '...',
+                                           '#..'])
+        self.assertFalse(grid.passable(0, 2))
+        self.assertFalse(grid.passable(-1, 0))
+        self.assertEqual(len(grid.bits), 2)
+        t_map = grid.to_time_map()
+        self.assertEqual(len(t_map), 7)
+        # diagonals may not cut the corner of a blocked cell
+        self.assertNotIn((0, 2), t_map[(1, 1)])
+        self.assertNotIn((2, 1), t_map[(1, 0)])
+        self.assertAlmostEqual(t_map[(0, 0)][(1, 1)], 2 ** 0.5)
+        grid.set_blocked(0, 2, False)
+        self.assertTrue(grid.passable(0, 2))
+
+    def test_same_cost_as_a_star(self):
+        for seed in range(8):
+            grid = OccupancyGrid.random(25, 25, density=0.1 + 0.04 * seed, seed=seed)
+            t_map = grid.to_time_map()
+            rng = random.Random(seed)
+            nodes = sorted(t_map)
+            for _ in range(15):
+                start, end = rng.choice(nodes), rng.choice(nodes)
+                expected = sc.a_star_search(octile, t_map, start, end)
+                path = jump_point_search(grid, start, end)
+                if expected:
+                    self.assertEqual((path[0], path[-1]), (start, end))
+                    self.assertAlmostEqual(path_cost(t_map, path), path_cost(t_map, expected))
+                else:
+                    self.assertEqual(path, [])
+
+    def test_fewer_expansions(self):
+        grid = OccupancyGrid.from_strings(['.' * 40] * 10 + ['.' * 35 + '#' * 5] + ['.' * 40] * 29)
+        t_map = grid.to_time_map()
+        expand.expand_count = 0
+        expected = sc.a_star_search(octile, t_map, (0, 39), (39, 0))
+        a_star_count = expand.expand_count
+        expand.expand_count = 0
+        path = jump_point_search(grid, (0, 39), (39, 0))
+        self.assertLess(expand.expand_count, a_star_count)
+        self.assertAlmostEqual(path_cost(t_map, path), path_cost(t_map, expected))
+
+class IndexedMinHeapTest(unittest.TestCase):
+
+    def test_tie_breaking(self):
+        heap = IndexedMinHeap()
+        for name, cost in [('YWCA', 3), ('Beach', 3), ('Campus', 1), ('Cinema', 3)]:
+            heap.push(name, cost)
+        order = [heap.pop()[1] for _ in range(len(heap))]
+        self.assertEqual(order, ['Campus', 'Beach', 'Cinema', 'YWCA'])
+
+    def test_decrease_key(self):
+        heap = IndexedMinHeap()
+        for i in range(100):
+            heap.push(i, 100 - i)
+        heap.decrease_key(5, -1)
+        self.assertIn(5, heap)
+        self.assertEqual(heap.priority(5), -1)
+        self.assertEqual(heap.pop(), [-1, 5])
+        self.assertNotIn(5, heap)
+        costs = [heap.pop()[0] for _ in range(len(heap))]
+        self.assertEqual(costs, sorted(costs))
+
+    def test_update_remove(self):
+        heap = IndexedMinHeap()
+        for i in range(50):
+            heap.push(i, i)
+        heap.update(0, 100)
+        heap.update(40, -5)
+        self.assertEqual(heap.remove(25), [25, 25])
+        self.assertNotIn(25, heap)
+        order = [heap.pop()[1] for _ in range(len(heap))]
+        self.assertEqual(order[0], 40)
+        self.assertEqual(order[-1], 0)
+        self.assertEqual(len(order), 49)
+
+class RouteServerTest(unittest.TestCase):
+
+    def test_requests(self):
+        ends = ['Cinema', 'Beach', 'YWCA', 'Waldalgesheim']
+        requests = [{'id': i, 'start': 'Campus', 'end': end} for i, end in enumerate(ends)]
+
+        async def run(path):
+            server = RouteServer(dis_map, time_map1, workers=1, batch_window=0.05)
+            await server.start_unix(path)
+            reader, writer = await asyncio.open_unix_connection(path)
+            lines = [json.dumps(request) + '\n' for request in requests]
+            writer.write((''.join(lines) + 'garbage\n' + '{"id": 9, "start": []}\n').encode('utf-8'))
+            await writer.drain()
+            writer.write_eof()
+            data = await reader.read()
+            responses = [json.loads(line) for line in data.decode('utf-8').splitlines()]
+            writer.close()
+            await writer.wait_closed()
+            await server.close()
+            return server, responses
+
+        with tempfile.TemporaryDirectory() as directory:
+            server, responses = asyncio.run(run(os.path.join(directory, 'route.sock')))
+        paths = {response['id']: response['path'] for response in responses if 'path' in response}
+        for i, end in enumerate(ends):
+            self.assertEqual(paths[i], sc.a_star_search(dis_map, time_map1, 'Campus', end))
+        self.assertEqual(paths[3], [])
+        errors = [response for response in responses if 'error' in response]
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(server.requests, 4)
+        self.assertLess(server.batches, server.requests)
+
+    def test_close_with_batch_in_flight(self):
+        async def run(path):
+            server = RouteServer(dis_map, time_map1, workers=1, batch_window=0)
+            await server.start_unix(path)
+            future = asyncio.get_running_loop().create_future()
+            await server.queue.put(('Campus', 'Cinema', future))
+            while not server.running:
+                await asyncio.sleep(0)
+            await server.close()
+            return future
+
+        with tempfile.TemporaryDirectory() as directory:
+            future = asyncio.run(run(os.path.join(directory, 'route.sock')))
+        self.assertEqual(future.result(), ['Campus', 'Whole_Food', 'Cinema'])
+
+    def test_close_with_requests_queued(self):
+        requests = [{'id': i, 'start': 'Campus', 'end': 'Cinema'} for i in range(6)]
+
+        async def run(path):
+            server = RouteServer(dis_map, time_map1, workers=1, batch_window=0, max_batch=1)
+            await server.start_unix(path)
+            # with the only worker slot taken the dispatcher holds the first
+            # request and the others stay in the queue
+            await server.slots.acquire()
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(''.join(json.dumps(request) + '\n' for request in requests).encode('utf-8'))
+            await writer.drain()
+            while server.queue.qsize() < len(requests) - 1:
+                await asyncio.sleep(0.001)
+            await asyncio.wait_for(server.close(), 10)
+            data = await asyncio.wait_for(reader.read(), 10)
+            writer.close()
+            return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+        with tempfile.TemporaryDirectory() as directory:
+            responses = asyncio.run(run(os.path.join(directory, 'route.sock')))
+        self.assertEqual(sorted(response['id'] for response in responses), list(range(6)))
+        for response in responses:
+            self.assertEqual(response['error'], 'server shutting down')
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,173 @@
+class IndexedMinHeap:
+	"""
+	Binary min-heap of unique items with position tracking
+
+	Entries are ordered by (priority, item), so items with the same priority
+	are popped in ascending (alphabetical) order. A position map from item to
+	heap index makes membership tests O(1) and decrease-key O(log n).
+	Operation counters and the peak size are kept for search statistics.
+	"""
+	def __init__(self):
+		self.heap = []
+		self.position = {}
+		self.pushes = 0
+		self.pops = 0
+		self.decreases = 0
+		self.updates = 0
+		self.removes = 0
+		self.peak = 0
+
+	def __len__(self):
+		return len(self.heap)
+
+	def __contains__(self, item):
+		return item in self.position
+
+	def priority(self, item):
+		"""
+		Gets the priority of an item in the heap
+
+		Parameters:
+		item (Hashable): item in the heap
+
+		Returns:
+		Number
+		"""
+		return self.heap[self.position[item]][0]
+
+	def peek(self):
+		"""
+		Gets the minimum entry without removing it
+
+		Returns:
+		List: [priority, item]
+		"""
+		return self.heap[0]
+
+	def push(self, item, priority):
+		"""
+		Adds a new item to the heap
+
+		Parameters:
+		item (Hashable): item not already in the heap
+		priority (Number): priority of the item
+
+		Returns:
+		None
+		"""
+		self.heap.append([priority, item])
+		self.position[item] = len(self.heap) - 1
+		self._sift_up(len(self.heap) - 1)
+		self.pushes += 1
+		if len(self.heap) > self.peak:
+			self.peak = len(self.heap)
+
+	def pop(self):
+		"""
+		Removes and returns the minimum entry
+
+		Returns:
+		List: [priority, item]
+		"""
+		self.pops += 1
+		heap = self.heap
+		last = heap.pop()
+		if not heap:
+			del self.position[last[1]]
+			return last
+		entry = heap[0]
+		heap[0] = last
+		self.position[last[1]] = 0
+		del self.position[entry[1]]
+		self._sift_down(0)
+		return entry
+
+	def decrease_key(self, item, priority):
+		"""
+		Lowers the priority of an item already in the heap
+
+		Parameters:
+		item (Hashable): item in the heap
+		priority (Number): new priority, not greater than the current one
+
+		Returns:
+		None
+		"""
+		self.decreases += 1
+		i = self.position[item]
+		self.heap[i][0] = priority
+		self._sift_up(i)
+
+	def update(self, item, priority):
+		"""
+		Changes the priority of an item already in the heap, up or down
+
+		Parameters:
+		item (Hashable): item in the heap
+		priority (Number): new priority
+
+		Returns:
+		None
+		"""
+		self.updates += 1
+		i = self.position[item]
+		self.heap[i][0] = priority
+		self._sift_up(i)
+		self._sift_down(self.position[item])
+
+	def remove(self, item):
+		"""
+		Removes an item from the heap
+
+		Parameters:
+		item (Hashable): item in the heap
+
+		Returns:
+		List: [priority, item]
+		"""
+		self.removes += 1
+		i = self.position.pop(item)
+		heap = self.heap
+		entry = heap[i]
+		last = heap.pop()
+		if i < len(heap):
+			heap[i] = last
+			self.position[last[1]] = i
+			self._sift_up(i)
+			self._sift_down(self.position[last[1]])
+		return entry
+
+	def _sift_up(self, i):
+		heap = self.heap
+		position = self.position
+		entry = heap[i]
+		while i > 0:
+			parent = (i - 1) >> 1
+			if entry < heap[parent]:
+				heap[i] = heap[parent]
+				position[heap[i][1]] = i
+				i = parent
+			else:
+				break
+		heap[i] = entry
+		position[entry[1]] = i
+
+	def _sift_down(self, i):
+		heap = self.heap
+		position = self.position
+		size = len(heap)
+		entry = heap[i]
+		while True:
+			child = 2 * i + 1
+			if child >= size:
+				break
+			if child + 1 < size and heap[child + 1] < heap[child]:
+				child += 1
+			if heap[child] < entry:
+				heap[i] = heap[child]
+				position[heap[i][1]] = i
+				i = child
+			else:
+				break
+		heap[i] = entry
+		position[entry[1]] = i
@@ -0,0 +1,166 @@
+import time
+from collections import OrderedDict
+
+from code import a_star_search
+
+class RouteCache:
+	"""
+	LRU cache with optional TTL in front of a_star_search
+
+	Entries are keyed on (start, end, graph version). Changing an edge
+	through update_edge bumps the version: if the edge got more expensive
+	(or was removed) routes that do not use it stay optimal and are carried
+	over to the new version, otherwise every route is dropped. A query whose
+	endpoints both lie, in order, on a cached route is answered with that
+	slice of the route, since subpaths of shortest paths are shortest paths.
+	Both rules assume the search returns optimal paths (admissible heuristic).
+
+	Attributes:
+		version (Int): graph version, bumped on every edge change
+		hits (Int): queries answered by a cached route
+		subpath_hits (Int): queries answered by a slice of a cached route
+		misses (Int): queries that ran the search
+		evictions (Int): routes dropped because the cache was full
+		expirations (Int): routes dropped because their TTL ran out
+	"""
+	def __init__(self, dis_map, time_map, max_size=1024, ttl=None, search=a_star_search, clock=time.monotonic):
+		self.dis_map = dis_map
+		self.time_map = time_map
+		self.max_size = max_size
+		self.ttl = ttl
+		self.search = search
+		self.clock = clock
+		self.version = 0
+		# (start, end, version) -> (path, expiry time), oldest first
+		self.entries = OrderedDict()
+		# node -> keys of the cached routes passing through it
+		self.routes_through = {}
+		self.hits = self.subpath_hits = self.misses = 0
+		self.evictions = self.expirations = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def route(self, start, end):
+		"""
+		Finds a path from start to end, from the cache when possible
+
+		Parameters:
+		start (Hashable): start node
+		end (Hashable): end node
+
+		Returns:
+		List: nodes from start to end, empty if there is no path
+		"""
+		key = (start, end, self.version)
+		if key in self.entries and self.fresh(key):
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return list(self.entries[key][0])
+
+		path = self.cached_subpath(start, end)
+		if path is not None:
+			self.subpath_hits += 1
+			return path
+
+		self.misses += 1
+		path = self.search(self.dis_map, self.time_map, start, end)
+		self.store(key, path)
+		return list(path)
+
+	def fresh(self, key):
+		# drops the entry when its TTL has run out
+		if self.entries[key][1] is not None and self.clock() >= self.entries[key][1]:
+			self.discard(key)
+			self.expirations += 1
+			return False
+		return True
+
+	def cached_subpath(self, start, end):
+		candidates = self.routes_through.get(start)
+		if not candidates or end not in self.routes_through:
+			return None
+		for key in list(candidates & self.routes_through[end]):
+			if not self.fresh(key):
+				continue
+			path = self.entries[key][0]
+			i = path.index(start)
+			j = path.index(end, i) if end in path[i:] else -1
+			if j >= 0:
+				self.entries.move_to_end(key)
+				return list(path[i:j + 1])
+		return None
+
+	def store(self, key, path):
+		expiry = self.clock() + self.ttl if self.ttl is not None else None
+		self.entries[key] = (tuple(path), expiry)
+		for node in path:
+			self.routes_through.setdefault(node, set()).add(key)
+		while len(self.entries) > self.max_size:
+			self.discard(next(iter(self.entries)))
+			self.evictions += 1
+
+	def discard(self, key):
+		path = self.entries.pop(key)[0]
+		for node in path:
+			keys = self.routes_through[node]
+			keys.discard(key)
+			if not keys:
+				del self.routes_through[node]
+
+	def update_edge(self, node, next_node, time):
+		"""
+		Changes the travel time of an edge in time_map and invalidates routes
+
+		Parameters:
+		node (Hashable): tail of the edge
+		next_node (Hashable): head of the edge
+		time (Number): new travel time, None removes the edge
+
+		Returns:
+		None
+		"""
+		old_time = self.time_map.get(node, {}).get(next_node)
+		self.time_map.setdefault(node, {})[next_node] = time
+		if old_time is not None and (time is None or time >= old_time):
+			# only routes through the edge can get worse
+			self.bump_version(keep=lambda path: not uses_edge(path, node, next_node))
+		else:
+			self.bump_version(keep=lambda path: False)
+
+	def invalidate(self):
+		# drops every route, for changes made to time_map directly
+		self.bump_version(keep=lambda path: False)
+
+	def bump_version(self, keep):
+		entries = self.entries
+		self.entries = OrderedDict()
+		self.routes_through = {}
+		self.version += 1
+		for (start, end, _), (path, expiry) in entries.items():
+			if keep(path):
+				key = (start, end, self.version)
+				self.entries[key] = (path, expiry)
+				for path_node in path:
+					self.routes_through.setdefault(path_node, set()).add(key)
+
+	def stats(self):
+		"""
+		Reports cache statistics
+
+		Returns:
+		Dict: hit and miss counters, hit rate, size and graph version
+		"""
+		queries = self.hits + self.subpath_hits + self.misses
+		return {
+			'hits': self.hits,
+			'subpath_hits': self.subpath_hits,
+			'misses': self.misses,
+			'hit_rate': (self.hits + self.subpath_hits) / queries if queries else 0.0,
+			'evictions': self.evictions,
+			'expirations': self.expirations,
+			'size': len(self.entries),
+			'version': self.version}
+
+def uses_edge(path, node, next_node):
+	return any(path[i] == node and path[i + 1] == next_node for i in range(len(path) - 1))
@@ -0,0 +1,59 @@
+class SearchStats:
+	"""
+	Counters of a single search, filled in when the search returns
+
+	Unlike expand.expand_count these belong to one query, so concurrent
+	searches do not mix their numbers.
+
+	Attributes:
+		expanded (Int): nodes expanded (calls to expand)
+		pushed (Int): nodes pushed into the open list
+		popped (Int): nodes popped from the open list
+		decrease_keys (Int): open nodes whose cost was lowered
+		peak_open (Int): largest size of the open list
+		heap_operations (Int): pushes, pops, decrease-keys, updates and removals
+		wall_time (Float): seconds spent in the search
+	"""
+	def __init__(self):
+		self.expanded = 0
+		self.pushed = 0
+		self.popped = 0
+		self.decrease_keys = 0
+		self.peak_open = 0
+		self.heap_operations = 0
+		self.wall_time = 0.0
+
+	def __repr__(self):
+		return 'SearchStats({})'.format(', '.join('{}={!r}'.format(k, v) for k, v in self.as_dict().items()))
+
+	def record(self, open_nodes, expanded, wall_time):
+		"""
+		Sets the counters to those of a finished search, replacing what an
+		earlier search recorded
+
+		Parameters:
+		open_nodes (IndexedMinHeap): open list of the search
+		expanded (Int): nodes expanded by the search
+		wall_time (Float): seconds spent in the search
+
+		Returns:
+		None
+		"""
+		self.expanded = expanded
+		self.pushed = open_nodes.pushes
+		self.popped = open_nodes.pops
+		self.decrease_keys = open_nodes.decreases
+		self.peak_open = open_nodes.peak
+		self.heap_operations = (open_nodes.pushes + open_nodes.pops + open_nodes.decreases
+			+ open_nodes.updates + open_nodes.removes)
+		self.wall_time = wall_time
+
+	def as_dict(self):
+		return {
+			'expanded': self.expanded,
+			'pushed': self.pushed,
+			'popped': self.popped,
+			'decrease_keys': self.decrease_keys,
+			'peak_open': self.peak_open,
+			'heap_operations': self.heap_operations,
+			'wall_time': self.wall_time}
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from code import a_star_search
+
+# maps of the worker process, set once per worker by _init_worker
+_dis_map = None
+_time_map = None
+
+def _init_worker(dis_map, time_map):
+	global _dis_map, _time_map
+	_dis_map = dis_map
+	_time_map = time_map
+
+def _route_batch(pairs):
+	return [a_star_search(_dis_map, _time_map, start, end) for start, end in pairs]
+
+class RouteServer:
+	"""
+	asyncio server answering a_star_search queries over a line protocol
+
+	Each request line is a JSON object {"id": ..., "start": ..., "end": ...}
+	and is answered, possibly out of order, by {"id": ..., "path": [...]} or
+	{"id": ..., "error": "..."}. The maps are loaded once into a pool of
+	worker processes. Requests arriving within batch_window seconds of each
+	other are sent to a worker as one batch, at most one batch per worker is
+	in flight, and once max_pending requests are waiting the server stops
+	reading from clients until the queue drains. close() answers the requests
+	no worker has taken with an error and hangs up on the clients.
+
+	Attributes:
+		requests (Int): requests answered
+		batches (Int): batches sent to the workers
+	"""
+	def __init__(self, dis_map, time_map, workers=None, batch_window=0.002, max_batch=64, max_pending=1024):
+		self.workers = workers or os.cpu_count() or 1
+		self.batch_window = batch_window
+		self.max_batch = max_batch
+		self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(dis_map, time_map))
+		self.queue = asyncio.Queue(max_pending)
+		self.slots = asyncio.Semaphore(self.workers)
+		self.requests = 0
+		self.batches = 0
+		self.server = None
+		self.dispatcher = None
+		self.running = set()
+		self.clients = set()
+
+	async def start_workers(self):
+		# fork the workers before any socket is open, otherwise they inherit
+		# client connections and keep them open after the server closes them
+		await asyncio.get_running_loop().run_in_executor(self.executor, _route_batch, [])
+		self.dispatcher = asyncio.ensure_future(self.dispatch())
+
+	async def start_unix(self, path):
+		await self.start_workers()
+		self.server = await asyncio.start_unix_server(self.handle_client, path)
+
+	async def start_tcp(self, host, port):
+		await self.start_workers()
+		self.server = await asyncio.start_server(self.handle_client, host, port)
+
+	async def close(self):
+		self.server.close()
+		self.dispatcher.cancel()
+		try:
+			await self.dispatcher
+		except asyncio.CancelledError:
+			pass
+		# let the batches in flight answer their requests before the pool goes
+		if self.running:
+			await asyncio.gather(*self.running, return_exceptions=True)
+		# nothing takes requests off the queue any more, refuse what is left
+		while not self.queue.empty():
+			self.refuse([self.queue.get_nowait()])
+		# stop reading from the clients, they answer what they sent and hang up
+		for task in self.clients:
+			task.cancel()
+		if self.clients:
+			await asyncio.gather(*self.clients, return_exceptions=True)
+		await self.server.wait_closed()
+		await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+	def refuse(self, batch):
+		for _, _, future in batch:
+			if not future.done():
+				future.set_exception(RuntimeError('server shutting down'))
+
+	async def dispatch(self):
+		loop = asyncio.get_running_loop()
+		while True:
+			batch = [await self.queue.get()]
+			try:
+				deadline = loop.time() + self.batch_window
+				while len(batch) < self.max_batch:
+					timeout = deadline - loop.time()
+					if timeout <= 0:
+						break
+					try:
+						batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+					except asyncio.TimeoutError:
+						break
+				await self.slots.acquire()
+			except asyncio.CancelledError:
+				# close() cancelled the dispatcher, the requests it holds still get an answer
+				self.refuse(batch)
+				raise
+			task = asyncio.ensure_future(self.run_batch(batch))
+			self.running.add(task)
+			task.add_done_callback(self.running.discard)
+
+	async def run_batch(self, batch):
+		try:
+			self.batches += 1
+			paths = await asyncio.get_running_loop().run_in_executor(
+				self.executor, _route_batch, [(start, end) for start, end, _ in batch])
+			for (_, _, future), path in zip(batch, paths):
+				if not future.done():
+					future.set_result(path)
+		except Exception as e:
+			for _, _, future in batch:
+				if not future.done():
+					future.set_exception(e)
+		finally:
+			self.slots.release()
+
+	async def handle_client(self, reader, writer):
+		loop = asyncio.get_running_loop()
+		lock = asyncio.Lock()
+		pending = set()
+		future = None
+		self.clients.add(asyncio.current_task())
+
+		async def respond(response):
+			async with lock:
+				writer.write((json.dumps(response) + '\n').encode('utf-8'))
+				await writer.drain()
+
+		async def answer(request_id, future):
+			try:
+				response = {'id': request_id, 'path': await future}
+			except Exception as e:
+				response = {'id': request_id, 'error': str(e)}
+			self.requests += 1
+			await respond(response)
+
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				try:
+					request = json.loads(line)
+					if not isinstance(request, dict) or 'start' not in request or 'end' not in request:
+						raise ValueError('a request needs start and end')
+					if not all(isinstance(request[key], (str, int, float)) for key in ('start', 'end')):
+						raise ValueError('start and end must be node names')
+				except ValueError as e:
+					await respond({'id': None, 'error': str(e)})
+					continue
+				future = loop.create_future()
+				task = asyncio.ensure_future(answer(request.get('id'), future))
+				pending.add(task)
+				task.add_done_callback(pending.discard)
+				# waiting for room in the queue stops reading from this client
+				await self.queue.put((request['start'], request['end'], future))
+		except asyncio.CancelledError:
+			# close() cancels the client, a request it could not queue is refused
+			if future is not None:
+				self.refuse([(None, None, future)])
+		try:
+			if pending:
+				await asyncio.gather(*pending)
+		finally:
+			self.clients.discard(asyncio.current_task())
+			writer.close()
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Serve a_star_search over a JSON line protocol.')
+	parser.add_argument('maps', help='JSON file with "dis_map" and "time_map" objects')
+	parser.add_argument('--socket', help='Unix socket path')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8765)
+	parser.add_argument('--workers', type=int)
+	parser.add_argument('--batch-window', type=float, default=0.002, help='seconds')
+	parser.add_argument('--max-pending', type=int, default=1024)
+	args = parser.parse_args(argv)
+
+	with open(args.maps) as f:
+		maps = json.load(f)
+
+	async def serve():
+		server = RouteServer(maps['dis_map'], maps['time_map'], args.workers, args.batch_window,
+			max_pending=args.max_pending)
+		if args.socket:
+			await server.start_unix(args.socket)
+		else:
+			await server.start_tcp(args.host, args.port)
+		try:
+			await asyncio.Event().wait()
+		finally:
+			await server.close()
+
+	asyncio.run(serve())
+
+if __name__ == "__main__":
+	main()
@@ -1,8 +1,29 @@
+import itertools
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# default domain of a variable
+BOOLEAN = [True, False]
 
 class BayesNet:
+    """
+    Bayes Net, a list of nodes where parents come before their children
+
+    Attributes:
+        variables (Array): nodes in insertion order, which is a topological order
+        variable_names (Array): names of the nodes in the same order
+        index (Dictionary): node by name
+        position (Dictionary): place of every name in variables
+        children (Dictionary): list of child nodes by name
+    """
     def __init__(self):
         self.variables = []
         self.variable_names = []
+        self.index = {}
+        self.position = {}
+        self.children = {}
 
     def add(self, node):
         """
@@ -14,16 +35,23 @@ class BayesNet:
         Returns:
         None
         """
-        if node.parents is None:
-            self.variables.append(node)
-            self.variable_names.append(node.name)
-        else:
-            for p in node.parents:
-                if p not in self.variable_names:
-                    print('Parent must be added to Net first')
-                    return
-            self.variables.append(node)
-            self.variable_names.append(node.name)
+        if node.name in self.index:
+            logger.warning('%s is already in the Net', node.name)
+            return
+        for p in node.parents or ():
+            if p not in self.index:
+                logger.warning('Parent %s of %s must be added to Net first', p, node.name)
+                return
+        parent_domains = [self.index[p].domain for p in node.parents or ()]
+        if node.cpt is None or parent_domains != node.parent_domains:
+            node.compile(parent_domains)
+        self.position[node.name] = len(self.variables)
+        self.variables.append(node)
+        self.variable_names.append(node.name)
+        self.index[node.name] = node
+        self.children[node.name] = []
+        for p in node.parents or ():
+            self.children[p].append(node)
 
     def get_var(self, name):
         """
@@ -33,19 +61,101 @@ class BayesNet:
         name (String): name of the variable
 
         Returns:
-        Object
+        Object, None if there is no such variable
         """
-        print("getting", name)
-        for v in self.variables:
-            if v.name == name:
-                return v
-        print("None found")
+        logger.debug('getting %s', name)
+        node = self.index.get(name)
+        if node is None:
+            logger.debug('None found')
+        return node
 
 class BayesNode:
-    def __init__(self, name, parents, values):
+    """
+    Node of a Bayes Net with its conditional probability table
+
+    The table given as values is also stored densely in cpt, an array of
+    floats indexed by row * len(domain) + the position of the node value in
+    domain, where row numbers the parent assignments in row-major order
+    over the parent domains, the first parent changing slowest. values is
+    only read when the table is built.
+
+    Attributes:
+        name (String): name of the variable
+        parents (Array): names of the parent variables, or None
+        values (Dictionary): distribution of the node keyed by '' for a
+            root, by the parent value for a single parent and by a tuple of
+            parent values otherwise; a distribution is a list of
+            probabilities in domain order or a dictionary by value, and for
+            a binary domain may be the probability of its first value
+        domain (Array): possible values of the variable, [True, False] by default
+        index (Dictionary): position of every value in domain
+        parent_domains (Array): domains of the parents the table was built for
+        cpt (Array): dense conditional probability table, None until the
+            parent domains are known
+    """
+    def __init__(self, name, parents, values, domain=None):
         self.name = name
         self.parents = parents
         self.values = values
+        self.domain = list(BOOLEAN if domain is None else domain)
+        self.index = dict((x, i) for i, x in enumerate(self.domain))
+        self.cpt = None
+        self.parent_domains = None
+        self.parent_index = None
+        self.boolean = False
+        # keys made only of True and False mean boolean parents, any other
+        # parent domains are only known once BayesNet.add looks them up
+        keys = [k if isinstance(k, tuple) else (k,) for k in values] if parents else []
+        if all(isinstance(x, bool) for key in keys for x in key):
+            self.compile([BOOLEAN] * len(parents or ()))
+
+    def compile(self, parent_domains):
+        """
+        Builds cpt from values
+
+        Parameters:
+        parent_domains (Array): domain of each parent
+
+        Returns:
+        None
+        """
+        card = len(self.domain)
+        if self.parents is None:
+            keys = ['']
+        elif len(self.parents) == 1:
+            keys = parent_domains[0]
+        else:
+            keys = itertools.product(*parent_domains)
+        cpt = array('d')
+        for key in keys:
+            v = self.values[key]
+            if isinstance(v, dict):
+                cpt.extend(v.get(x, 0.0) for x in self.domain)
+            elif isinstance(v, (list, tuple)):
+                if len(v) != card:
+                    raise ValueError('{} needs {} probabilities per row'.format(self.name, card))
+                cpt.extend(v)
+            elif card == 2:
+                cpt.append(v)
+                cpt.append(1-v)
+            else:
+                raise ValueError('{} needs a distribution over {}'.format(self.name, self.domain))
+        self.cpt = cpt
+        self.parent_domains = [list(d) for d in parent_domains]
+        self.parent_index = [dict((x, i) for i, x in enumerate(d)) for d in parent_domains]
+        # boolean nodes and parents keep the plain arithmetic of binary tables
+        self.boolean = self.domain == BOOLEAN and all(d == BOOLEAN for d in parent_domains)
+
+    def table(self):
+        """
+        Gets cpt, which non-boolean parents only allow to build in BayesNet.add
+
+        Returns:
+        Array
+        """
+        if self.cpt is None:
+            raise ValueError('{} has no table until it is added to a BayesNet'.format(self.name))
+        return self.cpt
 
     def __str__(self):
         return("({}, {}, {})".format(self.name, self.parents, self.values))
@@ -53,28 +163,75 @@ class BayesNode:
     def repr(self):
         return("({}, {}, {})".format(self.name, self.parents, self.values))
 
+    def row(self, evidence):
+        """
+        Number of the parent assignment in evidence
+
+        Parameters:
+        evidence (Dictionary): values of at least the parents
+
+        Returns:
+        Int
+        """
+        row = 0
+        if self.boolean:
+            for p in self.parents or ():
+                row = 2*row + (0 if evidence[p] else 1)
+        else:
+            for p, index in zip(self.parents or (), self.parent_index):
+                row = len(index)*row + index[evidence[p]]
+        return row
+
     def probability(self, hypothesis, evidence):
         """
         Calculates the associated joint probability
 
         Parameters:
-        hypothesis (Boolean): is the hypothesis True or False?
+        hypothesis (Object): value of the node, True or False for a boolean node
         evidence (Array): facts about the world state
 
         Returns:
         Float
         """
-        if self.parents is None:
-            v = self.values['']
-        elif len(self.parents) == 1:
-            v = self.values[evidence[self.parents[0]]]
-        else:
-            key = []
-            for p in self.parents:
-                if p in evidence:
-                    key.append(evidence[p])
-            v = self.values[tuple(key)]
-        if hypothesis:
-            return v
-        else:
-            return 1-v
+        if self.boolean:
+            return self.cpt[2*self.row(evidence) + (0 if hypothesis else 1)]
+        cpt = self.table()
+        return cpt[len(self.domain)*self.row(evidence) + self.index[hypothesis]]
+
+    def rows(self, columns, n):
+        """
+        Numbers of the parent assignments of many evidence rows at once
+
+        Parameters:
+        columns (Dictionary): sequence of n values by variable name,
+            holding at least the parents
+        n (Int): number of rows
+
+        Returns:
+        Array of Int
+        """
+        self.table()
+        rows = [0] * n
+        for p, index, domain in zip(self.parents or (), self.parent_index, self.parent_domains):
+            if domain == BOOLEAN:
+                rows = [2*r + (0 if v else 1) for r, v in zip(rows, columns[p])]
+            else:
+                card = len(index)
+                rows = [card*r + index[v] for r, v in zip(rows, columns[p])]
+        return rows
+
+    def probabilities(self, hypotheses, columns):
+        """
+        Evaluates probability for many evidence rows at once
+
+        Parameters:
+        hypotheses (Array): value of the node in each row
+        columns (Dictionary): sequence of values by variable name, holding
+            at least the parents, one value per row
+
+        Returns:
+        Array of Float
+        """
+        cpt, card, index = self.table(), len(self.domain), self.index
+        rows = self.rows(columns, len(hypotheses))
+        return array('d', [cpt[card*r + index[h]] for r, h in zip(rows, hypotheses)])
@@ -1,11 +1,9 @@
-HYPOTHESIS_SPACE = [True, False]
-
 def ask(var, value, evidence, bn):
 	# distribution over var, initially empty
 	distri = {}
 
 	# for each value of var
-	for x in HYPOTHESIS_SPACE:
+	for x in bn.index[var].domain:
 		# extend evidence with var: var = x
 		e = evidence.copy()
 		e.update({var: x})
@@ -20,16 +18,131 @@ def enumerate_all(variables, evidence):
 	Y = variables[0]
 
 	# if Y has value y in e
-	for y in HYPOTHESIS_SPACE:
+	for y in Y.domain:
 		if Y.name in evidence and y == evidence[Y.name]:
 			return Y.probability(y, evidence) * enumerate_all(variables[1:], evidence)
 
 	# if Y does not have value y in e
 	else:
 		sum = 0
-		for y in HYPOTHESIS_SPACE:
+		for y in Y.domain:
 			# extend evidence with Y = y
 			e = evidence.copy()
 			e.update({Y.name: y})
 			sum += Y.probability(y, e) * enumerate_all(variables[1:], e)
 		return sum
+
+class EnumerationCache:
+	"""
+	Memo table for memo_ask
+
+	The sum over variables[i:] only depends on the values of the earlier
+	variables that are parents of variables[i:] and on the evidence given
+	for variables[i:], so results are stored under (i, those values). The
+	table is kept across calls as long as the nodes, compared by identity,
+	and the set of evidence names stay the same.
+
+	Attributes:
+		hits (Int): lookups answered from the table
+		misses (Int): lookups that had to be computed
+	"""
+	def __init__(self):
+		self.table = {}
+		self.relevant = []
+		self.signature = None
+		self.nodes = []
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.table)
+
+	def prepare(self, variables, names):
+		"""
+		Computes the key variables of every position, resetting the table if
+		the network or the evidence names changed
+
+		Parameters:
+		variables (Array): Bayes Net variables in topological order
+		names (Set): names of the variables with a value in the evidence
+
+		Returns:
+		None
+		"""
+		# nodes are compared by identity, so another net with the same names
+		# starts a new table; holding them keeps their ids from being reused
+		signature = (tuple(map(id, variables)), frozenset(names))
+		if signature == self.signature:
+			return
+		self.signature = signature
+		self.nodes = list(variables)
+		self.table = {}
+		position = dict((v.name, i) for i, v in enumerate(variables))
+		# parents of variables[i:] assigned before i, built from the end
+		self.relevant = [[] for _ in range(len(variables) + 1)]
+		outside = set()
+		for i in range(len(variables) - 1, -1, -1):
+			outside.discard(variables[i].name)
+			outside.update(p for p in variables[i].parents or [] if position[p] < i)
+			given = [v.name for v in variables[i:] if v.name in names]
+			self.relevant[i] = sorted(outside, key=position.get) + given
+
+	def stats(self):
+		return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.table)}
+
+def memo_ask(var, value, evidence, bn, cache=None):
+	"""
+	Same as ask, with enumeration results shared between identical subtrees
+
+	Parameters:
+	var (String): name of the query variable
+	value (Object): value of var whose probability is wanted
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	cache (EnumerationCache): table to use, for reuse across queries and
+		to read statistics from
+
+	Returns:
+	Float
+	"""
+	if cache is None:
+		cache = EnumerationCache()
+	cache.prepare(bn.variables, set(evidence) | {var})
+
+	# distribution over var, initially empty
+	distri = {}
+
+	# one assignment is extended and restored in place instead of copied
+	e = evidence.copy()
+	for x in bn.index[var].domain:
+		e[var] = x
+		distri[x] = enumerate_memo(bn.variables, 0, e, cache)
+
+	return distri[value] / sum(distri.values())
+
+def enumerate_memo(variables, i, evidence, cache):
+	if i == len(variables): return 1.0
+
+	key = (i,) + tuple(evidence[name] for name in cache.relevant[i])
+	if key in cache.table:
+		cache.hits += 1
+		return cache.table[key]
+	cache.misses += 1
+
+	# Y is the variable at position i
+	Y = variables[i]
+
+	# if Y has a value in e
+	if Y.name in evidence:
+		result = Y.probability(evidence[Y.name], evidence) * enumerate_memo(variables, i + 1, evidence, cache)
+
+	# if Y does not have a value in e, sum over its values
+	else:
+		result = 0
+		for y in Y.domain:
+			evidence[Y.name] = y
+			result += Y.probability(y, evidence) * enumerate_memo(variables, i + 1, evidence, cache)
+		del evidence[Y.name]
+
+	cache.table[key] = result
+	return result
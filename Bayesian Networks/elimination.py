@@ -0,0 +1,300 @@
+class Factor:
+	"""
+	Table of non-negative numbers over a set of discrete variables
+
+	The table is stored as a flat list in row-major order: the last variable
+	changes fastest, and an assignment maps to the index sum(i_k * stride_k)
+	where i_k is the position of the value of variable k in its domain.
+
+	Attributes:
+		variables (Array): names of the variables the factor depends on
+		domains (Array): list of possible values of each variable
+		values (Array): flat table of the factor
+		strides (Array): index step of each variable in the flat table
+	"""
+	def __init__(self, variables, domains, values):
+		self.variables = list(variables)
+		self.domains = [list(d) for d in domains]
+		self.values = values
+		self.strides = [1] * len(self.variables)
+		for k in range(len(self.variables) - 2, -1, -1):
+			self.strides[k] = self.strides[k + 1] * len(self.domains[k + 1])
+
+	def __repr__(self):
+		return "Factor({}, {} entries)".format(self.variables, len(self.values))
+
+	@classmethod
+	def from_node(cls, node, evidence, domains):
+		"""
+		Builds the factor P(node | parents) with the evidence variables fixed
+
+		Parameters:
+		node (BayesNode): node whose conditional probability table is used
+		evidence (Dictionary): observed values by variable name
+		domains (Dictionary): list of possible values by variable name
+
+		Returns:
+		Factor
+		"""
+		# node.cpt is already a row-major table over parents + [node]
+		family = (node.parents or []) + [node.name]
+		table = cls(family, [domains[v] for v in family], node.cpt)
+		offset = 0
+		for v, d, s in zip(table.variables, table.domains, table.strides):
+			if v in evidence:
+				offset += s * d.index(evidence[v])
+		variables = [v for v in family if v not in evidence]
+		cards = [len(domains[v]) for v in variables]
+		values = [node.cpt[offset + i] for i in table.project(variables, cards)]
+		return cls(variables, [domains[v] for v in variables], values)
+
+	def project(self, variables, cards):
+		"""
+		Maps every assignment of variables, in row-major order, to the index of
+		the matching entry of this factor; variables must cover the factor's
+
+		Parameters:
+		variables (Array): names of the variables to enumerate
+		cards (Array): domain size of each of those variables
+
+		Returns:
+		Array
+		"""
+		stride = dict(zip(self.variables, self.strides))
+		positions = [0]
+		for v, card in zip(variables, cards):
+			s = stride.get(v, 0)
+			positions = [p + k * s for p in positions for k in range(card)]
+		return positions
+
+	def multiply(self, other):
+		"""
+		Pointwise product of two factors
+
+		Parameters:
+		other (Factor): factor to multiply with
+
+		Returns:
+		Factor
+		"""
+		variables = list(self.variables)
+		domains = list(self.domains)
+		for v, d in zip(other.variables, other.domains):
+			if v not in self.variables:
+				variables.append(v)
+				domains.append(d)
+		cards = [len(d) for d in domains]
+		a, b = self.values, other.values
+		values = [a[i] * b[j] for i, j in zip(self.project(variables, cards), other.project(variables, cards))]
+		return Factor(variables, domains, values)
+
+	def sum_out(self, var):
+		"""
+		Sums a variable out of the factor
+
+		Parameters:
+		var (String): name of the variable to eliminate
+
+		Returns:
+		Factor
+		"""
+		k = self.variables.index(var)
+		variables = self.variables[:k] + self.variables[k + 1:]
+		domains = self.domains[:k] + self.domains[k + 1:]
+		s, card = self.strides[k], len(self.domains[k])
+		a = self.values
+		base = self.project(variables, [len(d) for d in domains])
+		if card == 2:
+			values = [a[i] + a[i + s] for i in base]
+		else:
+			values = [sum(a[i + j * s] for j in range(card)) for i in base]
+		return Factor(variables, domains, values)
+
+	def sum_to(self, variables):
+		"""
+		Sums out every variable that is not in variables
+
+		Parameters:
+		variables (Array): names of the variables to keep
+
+		Returns:
+		Factor
+		"""
+		result = self
+		for v in self.variables:
+			if v not in variables:
+				result = result.sum_out(v)
+		return result
+
+	def divide(self, other):
+		"""
+		Pointwise quotient by a factor over a subset of the variables, with
+		0 / 0 taken as 0
+
+		Parameters:
+		other (Factor): divisor
+
+		Returns:
+		Factor
+		"""
+		a, b = self.values, other.values
+		cards = [len(d) for d in self.domains]
+		values = [x / b[j] if b[j] else 0.0 for x, j in zip(a, other.project(self.variables, cards))]
+		return Factor(self.variables, self.domains, values)
+
+	def observe(self, var, value):
+		"""
+		Sets the entries that disagree with an observed value to 0
+
+		Parameters:
+		var (String): name of the observed variable
+		value (Object): its observed value
+
+		Returns:
+		Factor
+		"""
+		k = self.variables.index(var)
+		s, card = self.strides[k], len(self.domains[k])
+		keep = self.domains[k].index(value)
+		values = [x if (i // s) % card == keep else 0.0 for i, x in enumerate(self.values)]
+		return Factor(self.variables, self.domains, values)
+
+	def normalize(self):
+		"""
+		Turns a factor over a single variable into a distribution
+
+		Returns:
+		Dictionary
+		"""
+		total = sum(self.values)
+		return dict((x, p / total) for x, p in zip(self.domains[0], self.values))
+
+def relevant_nodes(query, evidence, bn):
+	"""
+	Prunes barren nodes: only the query, the evidence and their ancestors can
+	affect the posterior, every other node sums out to 1
+
+	Parameters:
+	query (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+
+	Returns:
+	Array of BayesNode in topological order
+	"""
+	keep = set()
+	stack = [query] + list(evidence)
+	while stack:
+		name = stack.pop()
+		if name not in keep:
+			keep.add(name)
+			stack.extend(bn.index[name].parents or [])
+	return [bn.index[name] for name in sorted(keep, key=bn.position.get)]
+
+def elimination_order(scopes, hidden, heuristic='min_fill'):
+	"""
+	Greedy elimination ordering on the interaction graph of the factors
+
+	Parameters:
+	scopes (Array): variable lists of the factors
+	hidden (Array): variables to eliminate
+	heuristic (String): 'min_fill' picks the variable whose elimination adds
+		the fewest new edges, 'min_degree' the one with the fewest neighbours;
+		ties go to the smaller number of neighbours, then to the earlier one
+
+	Returns:
+	Array
+	"""
+	if heuristic not in ('min_fill', 'min_degree'):
+		raise ValueError('unknown elimination heuristic: {}'.format(heuristic))
+	neighbours = {}
+	for scope in scopes:
+		for v in scope:
+			neighbours.setdefault(v, set()).update(scope)
+	for v in neighbours:
+		neighbours[v].discard(v)
+
+	def fill(v):
+		adjacent = list(neighbours[v])
+		return sum(1 for i, a in enumerate(adjacent) for b in adjacent[i + 1:] if b not in neighbours[a])
+
+	remaining = [v for v in hidden if v in neighbours]
+	order = [v for v in hidden if v not in neighbours]
+	while remaining:
+		if heuristic == 'min_fill':
+			v = min(remaining, key=lambda v: (fill(v), len(neighbours[v])))
+		else:
+			v = min(remaining, key=lambda v: len(neighbours[v]))
+		remaining.remove(v)
+		order.append(v)
+		# connect the neighbours of v and take v out of the graph
+		for a in neighbours[v]:
+			neighbours[a].update(neighbours[v])
+			neighbours[a].discard(a)
+			neighbours[a].discard(v)
+		del neighbours[v]
+	return order
+
+def eliminate(factors, order):
+	"""
+	Sums the variables in order out of the product of the factors
+
+	Parameters:
+	factors (Array): list of Factor
+	order (Array): variables to eliminate
+
+	Returns:
+	Factor, the product of what is left
+	"""
+	factors = list(factors)
+	for var in order:
+		related = [f for f in factors if var in f.variables]
+		if not related:
+			continue
+		factors = [f for f in factors if var not in f.variables]
+		product = related[0]
+		for f in related[1:]:
+			product = product.multiply(f)
+		factors.append(product.sum_out(var))
+	result = factors[0]
+	for f in factors[1:]:
+		result = result.multiply(f)
+	return result
+
+def elimination_distribution(var, evidence, bn, heuristic='min_fill'):
+	"""
+	Posterior distribution of a variable by variable elimination
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	heuristic (String): elimination ordering, 'min_fill' or 'min_degree'
+
+	Returns:
+	Dictionary mapping each value of var to its probability
+	"""
+	# like ask, a value given for var itself is overridden by the query
+	evidence = dict((k, v) for k, v in evidence.items() if k != var)
+	nodes = relevant_nodes(var, evidence, bn)
+	domains = dict((v.name, v.domain) for v in nodes)
+	factors = [Factor.from_node(v, evidence, domains) for v in nodes]
+	hidden = [v.name for v in nodes if v.name != var and v.name not in evidence]
+	order = elimination_order([f.variables for f in factors], hidden, heuristic)
+	return eliminate(factors, order).normalize()
+
+def elimination_ask(var, value, evidence, bn, heuristic='min_fill'):
+	"""
+	Same as ask, computed by variable elimination
+
+	Parameters:
+	var (String): name of the query variable
+	value (Object): value of var whose probability is wanted
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	heuristic (String): elimination ordering, 'min_fill' or 'min_degree'
+
+	Returns:
+	Float
+	"""
+	return elimination_distribution(var, evidence, bn, heuristic)[value]
@@ -0,0 +1,258 @@
+from elimination import Factor, elimination_order, relevant_nodes
+
+class JunctionTree:
+	"""
+	Bayes Net compiled into a tree of cliques for repeated queries
+
+	The moral graph of the network is triangulated by a greedy elimination
+	order, the maximal cliques are joined by a maximum spanning tree on
+	separator size, and every conditional probability table is multiplied
+	into one clique that holds its family. Evidence is entered into clique
+	potentials and spread with Hugin messages: a collect pass towards a root
+	followed by a distribute pass away from it, after which every clique
+	holds the joint of its variables and the evidence, so all posteriors
+	are read off without further propagation.
+
+	Attributes:
+		names (Array): variable names in topological order
+		cliques (Array): variable lists of the cliques
+		separators (Array): (i, j, variables) for every tree edge
+		evidence (Dictionary): evidence the potentials currently hold
+		messages (Int): messages passed so far
+	"""
+	def __init__(self, bn, heuristic='min_fill', nodes=None):
+		# nodes restricts the tree to a subset of the network closed under parents
+		nodes = bn.variables if nodes is None else nodes
+		self.names = names = [v.name for v in nodes]
+		self.domains = dict((v.name, v.domain) for v in nodes)
+		families = [(v.parents or []) + [v.name] for v in nodes]
+
+		# moralize: connect every node with its parents and the parents with each other
+		neighbours = dict((name, set()) for name in names)
+		for family in families:
+			for v in family:
+				neighbours[v].update(family)
+		for v in names:
+			neighbours[v].discard(v)
+
+		# triangulate: the eliminated variable and its neighbours form a clique
+		cliques = []
+		for v in elimination_order(families, names, heuristic):
+			clique = neighbours[v] | {v}
+			if not any(clique <= c for c in cliques):
+				cliques.append(clique)
+			for a in neighbours[v]:
+				neighbours[a].update(neighbours[v])
+				neighbours[a].discard(a)
+				neighbours[a].discard(v)
+			del neighbours[v]
+		self.cliques = [sorted(c, key=bn.position.get) for c in cliques]
+
+		# maximum spanning tree on separator size (Kruskal), which has the
+		# running intersection property for the cliques of a triangulation
+		pairs = sorted(((len(cliques[i] & cliques[j]), i, j)
+			for i in range(len(cliques)) for j in range(i + 1, len(cliques))),
+			key=lambda pair: -pair[0])
+		component = list(range(len(cliques)))
+
+		def find(i):
+			while component[i] != i:
+				component[i] = component[component[i]]
+				i = component[i]
+			return i
+
+		self.separators = []
+		self.tree = dict((i, []) for i in range(len(cliques)))
+		for _, i, j in pairs:
+			if find(i) != find(j):
+				component[find(i)] = find(j)
+				variables = [v for v in self.cliques[i] if v in cliques[j]]
+				self.tree[i].append((j, len(self.separators)))
+				self.tree[j].append((i, len(self.separators)))
+				self.separators.append((i, j, variables))
+
+		# every variable is observed and read in the smallest clique holding it
+		self.home = {}
+		for i, c in enumerate(self.cliques):
+			for v in c:
+				if v not in self.home or len(c) < len(self.cliques[self.home[v]]):
+					self.home[v] = i
+
+		# initial potentials: each table goes to the smallest clique holding its family
+		self.base = [self.ones(c) for c in self.cliques]
+		for node, family in zip(nodes, families):
+			i = min((i for i, c in enumerate(cliques) if c.issuperset(family)), key=lambda i: len(cliques[i]))
+			self.base[i] = self.base[i].multiply(Factor.from_node(node, {}, self.domains))
+
+		self.evidence = {}
+		self.messages = 0
+		self.potentials = None
+		self.separator_potentials = None
+
+	def ones(self, variables):
+		domains = [self.domains[v] for v in variables]
+		size = 1
+		for d in domains:
+			size *= len(d)
+		return Factor(variables, domains, [1.0] * size)
+
+	def reset(self):
+		"""
+		Drops all evidence from the potentials
+
+		Returns:
+		None
+		"""
+		self.potentials = list(self.base)
+		self.separator_potentials = [self.ones(variables) for _, _, variables in self.separators]
+		self.evidence = {}
+
+	def pass_message(self, i, j, s):
+		# Hugin update: multiply clique j by the ratio of the new and old separator
+		separator = self.potentials[i].sum_to(self.separators[s][2])
+		self.potentials[j] = self.potentials[j].multiply(separator.divide(self.separator_potentials[s]))
+		self.separator_potentials[s] = separator
+		self.messages += 1
+
+	def walk(self, root):
+		# (clique, parent, separator) in breadth first order from root
+		order = [(root, None, None)]
+		seen = {root}
+		for i, _, _ in order:
+			for j, s in self.tree[i]:
+				if j not in seen:
+					seen.add(j)
+					order.append((j, i, s))
+		return order
+
+	def collect(self, root):
+		for i, parent, s in reversed(self.walk(root)[1:]):
+			self.pass_message(i, parent, s)
+
+	def distribute(self, root):
+		for i, parent, s in self.walk(root)[1:]:
+			self.pass_message(parent, i, s)
+
+	def set_evidence(self, evidence):
+		"""
+		Makes the potentials hold the given evidence. New findings on top of
+		the current evidence are propagated incrementally: a single distribute
+		pass from their clique if they all fall in one clique. Retracted or
+		changed findings start over from the initial potentials.
+
+		Parameters:
+		evidence (Dictionary): observed values by variable name
+
+		Returns:
+		None
+		"""
+		retracted = any(k not in evidence or evidence[k] != v for k, v in self.evidence.items())
+		if self.potentials is None or retracted:
+			self.reset()
+			new = list(evidence)
+			full = True
+		else:
+			new = [k for k in evidence if k not in self.evidence]
+			full = False
+			if not new:
+				return
+		for var in new:
+			i = self.home[var]
+			self.potentials[i] = self.potentials[i].observe(var, evidence[var])
+		homes = set(self.home[var] for var in new)
+		if not full and len(homes) == 1:
+			# the tree is already consistent, one pass spreads the findings
+			self.distribute(homes.pop())
+		else:
+			self.collect(0)
+			self.distribute(0)
+		self.evidence = dict(evidence)
+
+	def marginal(self, var):
+		"""
+		Posterior distribution of a variable given the current evidence
+
+		Parameters:
+		var (String): name of the variable
+
+		Returns:
+		Dictionary mapping each value of var to its probability
+		"""
+		return self.potentials[self.home[var]].sum_to([var]).normalize()
+
+	def marginals(self, evidence=None):
+		"""
+		Posterior distributions of all variables
+
+		Parameters:
+		evidence (Dictionary): evidence to set first, keeps the current one if None
+
+		Returns:
+		Dictionary mapping each variable name to its distribution
+		"""
+		if evidence is not None or self.potentials is None:
+			self.set_evidence(evidence or {})
+		return dict((var, self.marginal(var)) for var in self.names)
+
+	def ask(self, var, value, evidence):
+		"""
+		Same as ask, answered from the compiled tree
+
+		Parameters:
+		var (String): name of the query variable
+		value (Object): value of var whose probability is wanted
+		evidence (Dictionary): observed values by variable name
+
+		Returns:
+		Float
+		"""
+		# like ask, a value given for var itself is overridden by the query
+		self.set_evidence(dict((k, v) for k, v in evidence.items() if k != var))
+		return self.marginal(var)[value]
+
+	def probability_of_evidence(self):
+		"""
+		P(evidence) for the current evidence
+
+		Returns:
+		Float
+		"""
+		return sum(self.potentials[0].values)
+
+def ask_many(queries, evidence, bn):
+	"""
+	Posterior distributions of several variables given the same evidence,
+	from one junction tree over the query and evidence variables and their
+	ancestors, so the work is shared by all queries
+
+	Parameters:
+	queries (Array): names of the query variables
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+
+	Returns:
+	Dictionary mapping each query variable to its distribution; an observed
+	variable gets all the probability on its observed value
+	"""
+	keep = set()
+	for var in queries:
+		keep.update(v.name for v in relevant_nodes(var, evidence, bn))
+	if not keep:
+		return {}
+	nodes = [bn.index[name] for name in sorted(keep, key=bn.position.get)]
+	jt = JunctionTree(bn, nodes=nodes)
+	jt.set_evidence(evidence)
+	return dict((var, jt.marginal(var)) for var in queries)
+
+def all_marginals(evidence, bn):
+	"""
+	Posterior distribution of every variable of the network
+
+	Parameters:
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+
+	Returns:
+	Dictionary mapping each variable name to its distribution
+	"""
+	return JunctionTree(bn).marginals(evidence)
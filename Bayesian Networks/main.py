@@ -1,7 +1,48 @@
 from bayesnet import BayesNet, BayesNode
-from code import ask
+from code import ask, memo_ask, EnumerationCache
+from junction_tree import JunctionTree, ask_many, all_marginals
+from sampling import rejection_sampling, likelihood_weighting, gibbs_sampling, benchmark, parallel_likelihood_weighting
+from elimination import elimination_ask, elimination_distribution, elimination_order, relevant_nodes
+import itertools
+import random
 import unittest
 
+def make_burglary_net():
+	bn = BayesNet()
+	bn.add(BayesNode('Burglar',None,{'':0.001}))
+	bn.add(BayesNode('Earthquake',None,{'':0.002}))
+	bn.add(BayesNode('Alarm',['Burglar','Earthquake'],
+		{(False,False):0.001,(False,True):0.29,(True,False):0.94,(True,True):0.95}))
+	bn.add(BayesNode('JohnCalls', ['Alarm'], {True:0.9,False:0.05}))
+	bn.add(BayesNode('MaryCalls', ['Alarm'], {True:0.7,False:0.01}))
+	return bn
+
+def make_random_net(n, max_parents=3, seed=0):
+	rng = random.Random(seed)
+	bn = BayesNet()
+	for i in range(n):
+		parents = ['X{}'.format(j) for j in sorted(rng.sample(range(i), min(i, rng.randint(0, max_parents))))]
+		if not parents:
+			bn.add(BayesNode('X{}'.format(i), None, {'': rng.random()}))
+		elif len(parents) == 1:
+			bn.add(BayesNode('X{}'.format(i), parents, {True: rng.random(), False: rng.random()}))
+		else:
+			values = dict((key, rng.random()) for key in itertools.product([True, False], repeat=len(parents)))
+			bn.add(BayesNode('X{}'.format(i), parents, values))
+	return bn
+
+def make_weather_net():
+	bn = BayesNet()
+	bn.add(BayesNode('Weather', None, {'': [0.6, 0.3, 0.1]}, ['sun', 'rain', 'snow']))
+	bn.add(BayesNode('Holiday', None, {'': 0.2}))
+	bn.add(BayesNode('Umbrella', ['Weather'], {'sun': 0.1, 'rain': 0.8, 'snow': 0.3}))
+	bn.add(BayesNode('Traffic', ['Weather', 'Holiday'],
+		{('sun', True): [0.7, 0.2, 0.1], ('sun', False): [0.5, 0.3, 0.2],
+		('rain', True): [0.5, 0.3, 0.2], ('rain', False): {'low': 0.2, 'high': 0.7, 'jam': 0.1},
+		('snow', True): [0.4, 0.2, 0.4], ('snow', False): {'low': 0.1, 'jam': 0.9}},
+		['low', 'high', 'jam']))
+	return bn
+
 class BayesTest(unittest.TestCase):
 
 	def makeBurglaryNet(self):
@@ -44,6 +85,276 @@ class BayesTest(unittest.TestCase):
 		print('P(-e)=',a)
 		self.assertAlmostEqual( 0.998, a)
 
+class EliminationTest(unittest.TestCase):
+
+	def test_burglary(self):
+		bn = make_burglary_net()
+		cases = [('Alarm', True, {'Burglar':True, 'Earthquake':True}),
+			('Burglar', True, {'JohnCalls':True,'MaryCalls':True}),
+			('Alarm', True, {}),
+			('Alarm', True, {'Burglar':False}),
+			('Earthquake', False, {'Burglar':True}),
+			('JohnCalls', False, {'MaryCalls':True})]
+		for var, value, evidence in cases:
+			for heuristic in ('min_fill', 'min_degree'):
+				self.assertAlmostEqual(ask(var, value, evidence, bn), elimination_ask(var, value, evidence, bn, heuristic))
+
+	def test_random_net(self):
+		bn = make_random_net(12, seed=1)
+		evidence = {'X11': True, 'X7': False}
+		for i in range(11):
+			if 'X{}'.format(i) not in evidence:
+				var = 'X{}'.format(i)
+				self.assertAlmostEqual(ask(var, True, evidence, bn), elimination_ask(var, True, evidence, bn))
+
+	def test_pruning(self):
+		bn = make_burglary_net()
+		names = [v.name for v in relevant_nodes('Burglar', {'Alarm': True}, bn)]
+		self.assertEqual(names, ['Burglar', 'Earthquake', 'Alarm'])
+
+	def test_order(self):
+		# a chain is eliminated from its ends without fill edges
+		scopes = [['A'], ['A', 'B'], ['B', 'C'], ['C', 'D']]
+		self.assertEqual(elimination_order(scopes, ['B', 'C', 'D']), ['D', 'C', 'B'])
+		self.assertRaises(ValueError, elimination_order, scopes, ['B'], 'random')
+
+	def test_large_net(self):
+		bn = make_random_net(300, max_parents=2, seed=2)
+		evidence = dict(('X{}'.format(i), i % 2 == 0) for i in range(280, 300))
+		distribution = elimination_distribution('X150', evidence, bn)
+		self.assertAlmostEqual(sum(distribution.values()), 1.0)
+
+class MemoEnumerationTest(unittest.TestCase):
+
+	def test_burglary(self):
+		bn = make_burglary_net()
+		cases = [('Alarm', True, {'Burglar':True, 'Earthquake':True}),
+			('Burglar', True, {'JohnCalls':True,'MaryCalls':True}),
+			('Alarm', True, {}),
+			('Alarm', True, {'Burglar':False}),
+			('Earthquake', False, {'Burglar':True})]
+		for var, value, evidence in cases:
+			self.assertAlmostEqual(ask(var, value, evidence, bn), memo_ask(var, value, evidence, bn))
+
+	def test_cache(self):
+		bn = make_random_net(12, seed=3)
+		cache = EnumerationCache()
+		for value in (True, False):
+			evidence = {'X11': value, 'X2': True}
+			a = memo_ask('X5', True, evidence, bn, cache)
+			self.assertAlmostEqual(ask('X5', True, evidence, bn), a)
+		stats = cache.stats()
+		self.assertGreater(stats['hits'], 0)
+		self.assertEqual(stats['entries'], stats['misses'])
+		self.assertEqual(len(cache), stats['entries'])
+		# other evidence names start a new table
+		memo_ask('X5', True, {'X11': True}, bn, cache)
+		self.assertLess(len(cache), stats['entries'])
+
+	def test_cache_other_net(self):
+		# a net with the same names but other tables must not reuse the table
+		cache = EnumerationCache()
+		first, second = make_random_net(10, seed=7), make_random_net(10, seed=8)
+		self.assertEqual([v.name for v in first.variables], [v.name for v in second.variables])
+		memo_ask('X3', True, {'X9': True}, first, cache)
+		self.assertAlmostEqual(memo_ask('X3', True, {'X9': True}, second, cache), ask('X3', True, {'X9': True}, second))
+
+class CPTTest(unittest.TestCase):
+
+	def test_dense_table(self):
+		bn = make_burglary_net()
+		alarm = bn.variables[2]
+		self.assertEqual(len(alarm.cpt), 8)
+		self.assertAlmostEqual(alarm.cpt[0], 0.95)
+		self.assertAlmostEqual(alarm.cpt[7], 0.999)
+		self.assertEqual(alarm.row({'Burglar': False, 'Earthquake': True}), 2)
+		self.assertAlmostEqual(alarm.probability(True, {'Burglar': False, 'Earthquake': True}), 0.29)
+		self.assertAlmostEqual(bn.variables[0].probability(False, {}), 0.999)
+
+	def test_probabilities(self):
+		bn = make_random_net(8, seed=5)
+		rng = random.Random(5)
+		rows = [dict((v.name, rng.random() < 0.5) for v in bn.variables) for _ in range(50)]
+		columns = dict((v.name, [row[v.name] for row in rows]) for v in bn.variables)
+		for v in bn.variables:
+			batch = v.probabilities(columns[v.name], columns)
+			self.assertEqual(list(batch), [v.probability(row[v.name], row) for row in rows])
+
+class JunctionTreeTest(unittest.TestCase):
+
+	def test_burglary(self):
+		bn = make_burglary_net()
+		jt = JunctionTree(bn)
+		cases = [('Alarm', True, {'Burglar':True, 'Earthquake':True}),
+			('Burglar', True, {'JohnCalls':True,'MaryCalls':True}),
+			('Alarm', True, {}),
+			('Alarm', True, {'Burglar':False}),
+			('Earthquake', False, {'Burglar':True})]
+		for var, value, evidence in cases:
+			self.assertAlmostEqual(ask(var, value, evidence, bn), jt.ask(var, value, evidence))
+
+	def test_marginals(self):
+		bn = make_random_net(12, seed=1)
+		jt = JunctionTree(bn)
+		evidence = {'X11': True, 'X7': False}
+		marginals = jt.marginals(evidence)
+		self.assertEqual(sorted(marginals), sorted(v.name for v in bn.variables))
+		for var in marginals:
+			if var not in evidence:
+				self.assertAlmostEqual(marginals[var][True], ask(var, True, evidence, bn))
+		self.assertEqual(marginals['X7'], {True: 0.0, False: 1.0})
+
+	def test_incremental(self):
+		bn = make_burglary_net()
+		jt = JunctionTree(bn)
+		jt.set_evidence({'JohnCalls': True})
+		full = jt.messages
+		self.assertEqual(full, 2 * len(jt.separators))
+		# one new finding is spread by a single distribute pass
+		jt.set_evidence({'JohnCalls': True, 'MaryCalls': True})
+		self.assertEqual(jt.messages, full + len(jt.separators))
+		self.assertAlmostEqual(jt.marginal('Burglar')[True], 0.2841718)
+		jt.set_evidence({'JohnCalls': True, 'MaryCalls': True})
+		self.assertEqual(jt.messages, full + len(jt.separators))
+		# retracting a finding starts over
+		jt.set_evidence({'MaryCalls': True})
+		self.assertEqual(jt.messages, 2 * full + len(jt.separators))
+		self.assertAlmostEqual(jt.marginal('Burglar')[True], ask('Burglar', True, {'MaryCalls': True}, bn))
+		self.assertAlmostEqual(jt.probability_of_evidence(), ask('MaryCalls', True, {}, bn))
+
+	def test_ask_many(self):
+		bn = make_random_net(12, seed=1)
+		evidence = {'X11': True, 'X7': False}
+		queries = ['X0', 'X3', 'X5', 'X7']
+		posteriors = ask_many(queries, evidence, bn)
+		self.assertEqual(sorted(posteriors), sorted(queries))
+		for var in ['X0', 'X3', 'X5']:
+			self.assertAlmostEqual(posteriors[var][True], ask(var, True, evidence, bn))
+			self.assertAlmostEqual(sum(posteriors[var].values()), 1.0)
+		self.assertEqual(posteriors['X7'], {True: 0.0, False: 1.0})
+		self.assertEqual(ask_many([], evidence, bn), {})
+
+	def test_all_marginals(self):
+		bn = make_burglary_net()
+		marginals = all_marginals({'JohnCalls': True, 'MaryCalls': True}, bn)
+		self.assertEqual(len(marginals), 5)
+		self.assertAlmostEqual(marginals['Burglar'][True], 0.2841718)
+		self.assertAlmostEqual(marginals['Earthquake'][True], ask('Earthquake', True, {'JohnCalls': True, 'MaryCalls': True}, bn))
+
+class SamplingTest(unittest.TestCase):
+
+	def check(self, estimate, exact):
+		self.assertAlmostEqual(sum(estimate.distribution.values()), 1.0)
+		self.assertLess(abs(estimate.distribution[True] - exact), 4 * estimate.standard_error[True] + 1e-3)
+
+	def test_rejection(self):
+		bn = make_burglary_net()
+		estimate = rejection_sampling('Alarm', {'JohnCalls': True}, bn, 50000, seed=1)
+		self.check(estimate, ask('Alarm', True, {'JohnCalls': True}, bn))
+		self.assertLess(estimate.effective_samples, estimate.samples)
+		self.assertRaises(ValueError, rejection_sampling, 'Alarm', {'JohnCalls': True, 'MaryCalls': True}, bn, 10, 1)
+
+	def test_likelihood_weighting(self):
+		bn = make_random_net(12, seed=1)
+		evidence = {'X11': True, 'X7': False}
+		estimate = likelihood_weighting('X3', evidence, bn, 30000, seed=2, batch=7000)
+		self.check(estimate, ask('X3', True, evidence, bn))
+		self.assertEqual(estimate.samples, 30000)
+		self.assertEqual(likelihood_weighting('X3', evidence, bn, 1000, seed=2).distribution,
+			likelihood_weighting('X3', evidence, bn, 1000, seed=2).distribution)
+
+	def test_gibbs(self):
+		bn = make_random_net(12, seed=1)
+		evidence = {'X11': True, 'X7': False}
+		estimate = gibbs_sampling('X3', evidence, bn, 5000, seed=3)
+		self.check(estimate, ask('X3', True, evidence, bn))
+
+	def test_parallel(self):
+		bn = make_random_net(12, seed=1)
+		evidence = {'X11': True, 'X7': False}
+		serial = parallel_likelihood_weighting('X3', evidence, bn, 20000, seed=4, workers=1, chunk=5000)
+		parallel = parallel_likelihood_weighting('X3', evidence, bn, 20000, seed=4, workers=2, chunk=5000)
+		self.assertEqual(serial.distribution, parallel.distribution)
+		self.assertEqual(serial.effective_samples, parallel.effective_samples)
+		self.check(parallel, ask('X3', True, evidence, bn))
+		self.assertLess(parallel.effective_samples, parallel.samples)
+
+	def test_benchmark(self):
+		bn = make_burglary_net()
+		results = benchmark('Burglar', {'Alarm': True}, bn, n=20000)
+		self.assertEqual(sorted(results), ['gibbs', 'likelihood_weighting', 'rejection'])
+		for estimate in results.values():
+			self.assertGreater(estimate.samples_per_second, 0)
+
+class BayesNetIndexTest(unittest.TestCase):
+
+	def test_index(self):
+		bn = make_burglary_net()
+		self.assertIs(bn.get_var('Alarm'), bn.variables[2])
+		self.assertIsNone(bn.get_var('Nothing'))
+		self.assertEqual([v.name for v in bn.children['Alarm']], ['JohnCalls', 'MaryCalls'])
+		self.assertEqual(bn.position['MaryCalls'], 4)
+
+	def test_rejected_nodes(self):
+		bn = make_burglary_net()
+		with self.assertLogs('bayesnet', 'WARNING'):
+			bn.add(BayesNode('Late', ['Traffic'], {True: 0.5, False: 0.1}))
+		with self.assertLogs('bayesnet', 'WARNING'):
+			bn.add(BayesNode('Alarm', None, {'': 0.5}))
+		self.assertEqual(len(bn.variables), 5)
+		self.assertEqual(len(bn.index), 5)
+
+	def test_large_net(self):
+		bn = make_random_net(5000, seed=6)
+		self.assertEqual(len(bn.variables), 5000)
+		for v in bn.variables:
+			for p in v.parents or ():
+				self.assertLess(bn.position[p], bn.position[v.name])
+				self.assertIn(v, bn.children[p])
+
+class MultiValuedTest(unittest.TestCase):
+
+	def test_node(self):
+		bn = make_weather_net()
+		umbrella = bn.get_var('Umbrella')
+		self.assertEqual(len(umbrella.cpt), 6)
+		self.assertAlmostEqual(umbrella.probability(False, {'Weather': 'snow'}), 0.7)
+		traffic = bn.get_var('Traffic')
+		self.assertEqual(len(traffic.cpt), 18)
+		self.assertAlmostEqual(traffic.probability('jam', {'Weather': 'rain', 'Holiday': False}), 0.1)
+		self.assertRaises(ValueError, BayesNode, 'Weather', None, {'': 0.5}, ['sun', 'rain', 'snow'])
+		# the table of a node with non-boolean parents waits for BayesNet.add
+		node = BayesNode('Umbrella', ['Weather'], {'sun': 0.1, 'rain': 0.8, 'snow': 0.3})
+		self.assertIsNone(node.cpt)
+		self.assertRaises(ValueError, node.probability, True, {'Weather': 'sun'})
+		self.assertRaises(ValueError, node.rows, {'Weather': ['sun']}, 1)
+		# a boolean table missing a row fails right away
+		self.assertRaises(KeyError, BayesNode, 'JohnCalls', ['Alarm'], {True: 0.9})
+
+	def test_exact(self):
+		bn = make_weather_net()
+		# P(rain | umbrella) = 0.3 * 0.8 / (0.6 * 0.1 + 0.3 * 0.8 + 0.1 * 0.3)
+		self.assertAlmostEqual(ask('Weather', 'rain', {'Umbrella': True}, bn), 0.24 / 0.33)
+		jt = JunctionTree(bn)
+		for var, value, evidence in [('Weather', 'snow', {'Traffic': 'jam', 'Umbrella': False}),
+				('Traffic', 'high', {'Umbrella': True}),
+				('Holiday', True, {'Traffic': 'low'})]:
+			exact = ask(var, value, evidence, bn)
+			self.assertAlmostEqual(memo_ask(var, value, evidence, bn), exact)
+			self.assertAlmostEqual(elimination_ask(var, value, evidence, bn), exact)
+			self.assertAlmostEqual(jt.ask(var, value, evidence), exact)
+		marginals = all_marginals({'Umbrella': True}, bn)
+		self.assertEqual(sorted(marginals['Traffic']), ['high', 'jam', 'low'])
+
+	def test_sampling(self):
+		bn = make_weather_net()
+		exact = ask('Weather', 'rain', {'Traffic': 'jam'}, bn)
+		estimate = likelihood_weighting('Weather', {'Traffic': 'jam'}, bn, 20000, seed=7)
+		self.assertEqual(sorted(estimate.distribution), ['rain', 'snow', 'sun'])
+		self.assertLess(abs(estimate.distribution['rain'] - exact), 4 * estimate.standard_error['rain'] + 1e-3)
+		estimate = gibbs_sampling('Weather', {'Traffic': 'jam'}, bn, 5000, seed=7)
+		self.assertLess(abs(estimate.distribution['rain'] - exact), 4 * estimate.standard_error['rain'] + 1e-3)
+
 
 if __name__== "__main__":
 	unittest.main()
@@ -0,0 +1,320 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bayesnet import BOOLEAN
+
+class Estimate:
+	"""
+	Result of a sampling query
+
+	Attributes:
+		distribution (Dictionary): estimated probability of each value
+		standard_error (Dictionary): standard error of each probability
+		samples (Int): samples drawn
+		effective_samples (Float): number of independent, unweighted samples
+			worth the same accuracy
+		seconds (Float): time spent sampling
+	"""
+	def __init__(self, distribution, standard_error, samples, effective_samples, seconds):
+		self.distribution = distribution
+		self.standard_error = standard_error
+		self.samples = samples
+		self.effective_samples = effective_samples
+		self.seconds = seconds
+
+	def __repr__(self):
+		return "Estimate({}, se={}, samples={}, ess={:.1f})".format(
+			self.distribution, self.standard_error, self.samples, self.effective_samples)
+
+	@property
+	def samples_per_second(self):
+		return self.samples / self.seconds if self.seconds else float('inf')
+
+def binomial_estimate(counts, effective_samples, samples, seconds):
+	# counts hold (weighted) totals of each value, the error of a proportion
+	# p from m independent samples is sqrt(p(1-p)/m)
+	total = sum(counts.values())
+	if not total:
+		raise ValueError('no sample agrees with the evidence')
+	distribution = dict((x, c / total) for x, c in counts.items())
+	standard_error = dict((x, math.sqrt(p * (1 - p) / effective_samples)) for x, p in distribution.items())
+	return Estimate(distribution, standard_error, samples, effective_samples, seconds)
+
+def sample_columns(bn, evidence, n, rng):
+	"""
+	Draws n samples at once, one column of values per variable, fixing the
+	evidence variables and weighting each sample by their likelihood
+
+	Parameters:
+	bn (BayesNet): the network, its variables in topological order
+	evidence (Dictionary): observed values by variable name
+	n (Int): number of samples
+	rng (Random): random number generator
+
+	Returns:
+	(Dictionary of columns by variable name, Array of weights)
+	"""
+	columns = {}
+	weights = [1.0] * n
+	draw = rng.random
+	for node in bn.variables:
+		cpt, card = node.cpt, len(node.domain)
+		rows = node.rows(columns, n)
+		if node.name in evidence:
+			value = evidence[node.name]
+			k = node.index[value]
+			weights = [w * cpt[card*r + k] for w, r in zip(weights, rows)]
+			columns[node.name] = [value] * n
+		elif node.domain == BOOLEAN:
+			columns[node.name] = [draw() < cpt[2*r] for r in rows]
+		else:
+			columns[node.name] = [categorical(node.domain, cpt, card*r, draw()) for r in rows]
+	return columns, weights
+
+def categorical(domain, cpt, base, u):
+	# value whose cumulative probability in cpt[base:base + len(domain)] passes u
+	for k in range(len(domain) - 1):
+		u -= cpt[base + k]
+		if u < 0:
+			return domain[k]
+	return domain[-1]
+
+def rejection_sampling(var, evidence, bn, n, seed=None, batch=100000):
+	"""
+	Estimates the posterior of var from prior samples that agree with the evidence
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of samples
+	seed (Int): seed of the random number generator
+	batch (Int): samples drawn at once
+
+	Returns:
+	Estimate
+	"""
+	rng = random.Random(seed)
+	start = time.perf_counter()
+	counts = dict((x, 0) for x in bn.index[var].domain)
+	accepted = 0
+	for m in batch_sizes(n, batch):
+		columns, _ = sample_columns(bn, {}, m, rng)
+		keep = [True] * m
+		for name, value in evidence.items():
+			keep = [k and x == value for k, x in zip(keep, columns[name])]
+		for value, ok in zip(columns[var], keep):
+			if ok:
+				counts[value] += 1
+				accepted += 1
+	return binomial_estimate(counts, accepted, n, time.perf_counter() - start)
+
+def likelihood_weighting(var, evidence, bn, n, seed=None, batch=100000):
+	"""
+	Estimates the posterior of var from samples with the evidence fixed,
+	weighted by its likelihood
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of samples
+	seed (Int): seed of the random number generator
+	batch (Int): samples drawn at once
+
+	Returns:
+	Estimate, whose effective_samples is (sum of weights)^2 / sum of squared weights
+	"""
+	rng = random.Random(seed)
+	start = time.perf_counter()
+	counts, total, squares = weighted_counts(var, evidence, bn, n, rng, batch)
+	effective_samples = total * total / squares if squares else 0.0
+	return binomial_estimate(counts, effective_samples, n, time.perf_counter() - start)
+
+def weighted_counts(var, evidence, bn, n, rng, batch=100000):
+	"""
+	Likelihood weighting totals, the part of likelihood_weighting that can be
+	summed across independent runs
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of samples
+	rng (Random): random number generator
+	batch (Int): samples drawn at once
+
+	Returns:
+	(Dictionary of the weight of each value, sum of weights, sum of squared weights)
+	"""
+	counts = dict((x, 0.0) for x in bn.index[var].domain)
+	total = squares = 0.0
+	for m in batch_sizes(n, batch):
+		columns, weights = sample_columns(bn, evidence, m, rng)
+		for value, w in zip(columns[var], weights):
+			counts[value] += w
+		total += sum(weights)
+		squares += sum(w * w for w in weights)
+	return counts, total, squares
+
+# network of the pool workers, set once per worker by _init_worker
+_bn = None
+
+def _init_worker(bn):
+	global _bn
+	_bn = bn
+
+def _weighted_task(task):
+	# every task has its own stream, so the result does not depend on which
+	# worker runs it or how many workers there are
+	var, evidence, n, seed, index, batch = task
+	rng = random.Random('{}-{}'.format(seed, index))
+	return weighted_counts(var, evidence, _bn, n, rng, batch)
+
+def parallel_likelihood_weighting(var, evidence, bn, n, seed=0, workers=None, chunk=50000, batch=100000):
+	"""
+	Likelihood weighting spread over a process pool
+
+	The samples are cut into tasks of chunk samples, each drawn from a random
+	stream seeded by seed and the task number, so the estimate is the same
+	for any number of workers. The network is sent to each worker once, when
+	the worker starts, and the weighted counts of the tasks are summed.
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of samples
+	seed (Int): seed of the random streams
+	workers (Int): pool size, defaults to the number of CPUs, 1 runs in this process
+	chunk (Int): samples per task
+	batch (Int): samples drawn at once within a task
+
+	Returns:
+	Estimate, whose effective_samples is (sum of weights)^2 / sum of squared weights
+	"""
+	start = time.perf_counter()
+	tasks = [(var, evidence, m, seed, i, batch) for i, m in enumerate(batch_sizes(n, chunk))]
+	workers = min(workers or os.cpu_count() or 1, len(tasks))
+	if workers <= 1:
+		_init_worker(bn)
+		try:
+			results = [_weighted_task(task) for task in tasks]
+		finally:
+			_init_worker(None)
+	else:
+		with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(bn,)) as executor:
+			results = list(executor.map(_weighted_task, tasks))
+
+	counts = dict((x, 0.0) for x in bn.index[var].domain)
+	total = squares = 0.0
+	for task_counts, task_total, task_squares in results:
+		for x in counts:
+			counts[x] += task_counts[x]
+		total += task_total
+		squares += task_squares
+	effective_samples = total * total / squares if squares else 0.0
+	return binomial_estimate(counts, effective_samples, n, time.perf_counter() - start)
+
+def batch_sizes(n, batch):
+	return [min(batch, n - i) for i in range(0, n, batch)]
+
+def markov_blanket_sample(node, state, children, rng):
+	"""
+	Draws a value of node given all other variables, from
+	P(x | parents) * product of P(child | its parents) over the children
+
+	Parameters:
+	node (BayesNode): variable to resample
+	state (Dictionary): current values of all variables, updated in place
+	children (Array): child nodes of node
+	rng (Random): random number generator
+
+	Returns:
+	None
+	"""
+	weights = []
+	for x in node.domain:
+		state[node.name] = x
+		w = node.probability(x, state)
+		for child in children:
+			w *= child.probability(state[child.name], state)
+		weights.append(w)
+	r = rng.random() * sum(weights)
+	for x, w in zip(node.domain, weights):
+		if r < w:
+			break
+		r -= w
+	state[node.name] = x
+
+def gibbs_sampling(var, evidence, bn, n, seed=None, burn_in=100, batches=20):
+	"""
+	Estimates the posterior of var with a Gibbs sampler that resamples every
+	hidden variable from its Markov blanket once per sweep
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of sweeps counted
+	seed (Int): seed of the random number generator
+	burn_in (Int): sweeps discarded first
+	batches (Int): the chain is cut into this many batches whose means give
+		the standard error, which accounts for the correlation of the chain
+
+	Returns:
+	Estimate
+	"""
+	rng = random.Random(seed)
+	start = time.perf_counter()
+	hidden = [v for v in bn.variables if v.name not in evidence]
+
+	# start from a likelihood weighting sample, which agrees with the evidence
+	columns, _ = sample_columns(bn, evidence, 1, rng)
+	state = dict((name, column[0]) for name, column in columns.items())
+
+	chain = []
+	for sweep in range(burn_in + n):
+		for node in hidden:
+			markov_blanket_sample(node, state, bn.children[node.name], rng)
+		if sweep >= burn_in:
+			chain.append(state[var])
+
+	domain = bn.index[var].domain
+	distribution = dict((x, chain.count(x) / n) for x in domain)
+	size = n // batches
+	standard_error = {}
+	for x in domain:
+		means = [chain[i * size:(i + 1) * size].count(x) / size for i in range(batches)] if size else []
+		if len(means) > 1:
+			mean = sum(means) / len(means)
+			variance = sum((m - mean) ** 2 for m in means) / (len(means) - 1)
+			standard_error[x] = math.sqrt(variance / len(means))
+		else:
+			standard_error[x] = float('inf')
+	# effective sample size implied by the batch means error
+	p, se = distribution[domain[0]], standard_error[domain[0]]
+	effective_samples = min(n, p * (1 - p) / (se * se)) if se else float(n)
+	return Estimate(distribution, standard_error, n, effective_samples, time.perf_counter() - start)
+
+def benchmark(var, evidence, bn, n=100000, seed=0):
+	"""
+	Runs every sampler on the same query
+
+	Parameters:
+	var (String): name of the query variable
+	evidence (Dictionary): observed values by variable name
+	bn (BayesNet): the network
+	n (Int): number of samples, Gibbs sampling runs n // 10 sweeps
+	seed (Int): seed of the random number generators
+
+	Returns:
+	Dictionary mapping each sampler name to its Estimate
+	"""
+	return {
+		'rejection': rejection_sampling(var, evidence, bn, n, seed),
+		'likelihood_weighting': likelihood_weighting(var, evidence, bn, n, seed),
+		'gibbs': gibbs_sampling(var, evidence, bn, n // 10, seed)}